@@ -6,6 +6,7 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).parent.parent
 LOGS_DIR = BASE_DIR / "logs"
+CACHE_DIR = BASE_DIR / "cache"
 
 # Use Google Drive folder for invoices (configured via .env)
 INVOICES_DIR_OVERRIDE = os.getenv("INVOICES_DIR")
@@ -43,6 +44,10 @@ class OpenAIConfig:
     API_KEY = os.getenv("OPENAI_API_KEY")
     MODEL = "gpt-4-vision-preview"
     MAX_TOKENS = 4000
+    MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "50"))  # Sizes the httpx connection pools (not the aiohttp transport)
+    # Proactive throttling limits - set to your OpenAI usage tier (defaults: Tier 2)
+    MAX_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "5000"))
+    MAX_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "450000"))
 
 class SnowflakeConfig:
     ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")
@@ -54,4 +59,9 @@ class SnowflakeConfig:
     ROLE = os.getenv("SNOWFLAKE_ROLE")
 
 class AppConfig:
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    DECISION_CACHE_ENABLED = os.getenv("DECISION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    INVOICE_WORKERS = int(os.getenv("INVOICE_WORKERS", "3"))  # Concurrent extractions in run_invoice_extraction
+    DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "1"))  # Parallel browser sessions in run_invoice_download
+    PRETTY_PROMPT = os.getenv("PRETTY_PROMPT", "false").lower() == "true"  # Indent prompt JSON for local debugging
\ No newline at end of file
@@ -11,9 +11,8 @@ import sys
 import os
 from pathlib import Path
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 
 def print_header():
@@ -216,10 +215,10 @@ def check_snowflake_connection():
     print("=" * 80)
 
     try:
-        from src.clients.snowflake_data_client import SnowflakeDataClient
+        from src.clients.snowflake_data_client import get_snowflake_client
 
         print("\n🔄 Connecting to Snowflake...")
-        client = SnowflakeDataClient()
+        client = get_snowflake_client()
 
         print("✅ Connection successful!")
         print(f"   Database: PSEDM_FINANCE_PROD")
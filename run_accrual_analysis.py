@@ -8,31 +8,28 @@ Usage:
     python run_accrual_analysis.py --month "Feb 2025"        # Specify analysis month
     python run_accrual_analysis.py --workers 5               # Use 5 parallel workers
     python run_accrual_analysis.py --month "Oct 2025" --workers 5  # Combine options
+    python run_accrual_analysis.py --month "Oct 2025" --batch      # OpenAI Batch API (50% cheaper, up to 24h)
+    python run_accrual_analysis.py --group 5                 # Score 5 PO lines per request
 """
 
 import sys
 import os
 import csv
 import time
+import asyncio
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.utils.logger import setup_logger
-from src.clients.snowflake_data_client import SnowflakeDataClient
+from src.clients.snowflake_data_client import get_snowflake_client
 from src.processors.accrual_engine import AccrualEngine
 from config.settings import CSV_RESULTS_DIR
 
 logger = setup_logger(__name__)
 
-# Lock for thread-safe console output
-console_lock = Lock()
-
 
 def get_analysis_month() -> str:
     """
@@ -85,8 +82,8 @@ def get_analysis_month() -> str:
         print("❌ Invalid choice. Please select 1-8.")
 
 
-def process_single_po(po_line: dict, bills_by_po: dict, accrual_engine: AccrualEngine,
-                       index: int, total: int) -> tuple:
+async def process_single_po(po_line: dict, bills_by_po: dict, accrual_engine: AccrualEngine,
+                            semaphore: asyncio.Semaphore, index: int, total: int) -> tuple:
     """
     Process a single PO line for accrual analysis
 
@@ -94,6 +91,7 @@ def process_single_po(po_line: dict, bills_by_po: dict, accrual_engine: AccrualE
         po_line: PO line data
         bills_by_po: Dictionary of bills grouped by PO
         accrual_engine: AccrualEngine instance
+        semaphore: Semaphore bounding the number of concurrent OpenAI requests
         index: Current index
         total: Total number of POs
 
@@ -107,38 +105,121 @@ def process_single_po(po_line: dict, bills_by_po: dict, accrual_engine: AccrualE
     # Get related bills for this PO from in-memory lookup
     related_bills = bills_by_po.get(po_num, [])
 
-    # Thread-safe console output for start
-    with console_lock:
+    async with semaphore:
+        # Console output for start (single event loop thread, no lock needed)
         print(f"\n[{index}/{total}] PO: {po_num}")
         print(f"   Vendor: {vendor}")
         print(f"   Description: {description}...")
         print(f"   Related bills: {len(related_bills)}")
         print("-" * 60)
 
-    # Analyze
-    start_time = time.time()
-    decision = accrual_engine.analyze_po_line(po_line, related_bills)
-    analysis_time = time.time() - start_time
+        # Analyze
+        start_time = time.time()
+        decision = await accrual_engine.analyze_po_line_async(po_line, related_bills)
+        analysis_time = time.time() - start_time
 
-    # Thread-safe console output for result
-    with console_lock:
-        if decision.needs_accrual:
-            print(f"   [{po_num}] ✅ ACCRUAL NEEDED")
-            print(f"   [{po_num}] 💰 Amount: {decision.accrual_amount:,.2f} {po_line.get('FOREIGN_CURRENCY', '')}")
-        else:
-            print(f"   [{po_num}] ⭕ No accrual needed")
+    print_decision(po_line, decision, analysis_time)
+    return (po_line, decision, analysis_time)
 
-        print(f"   [{po_num}] 📝 Reasoning: {decision.reasoning[:80]}...")
-        print(f"   [{po_num}] 🎯 Confidence: {decision.confidence_score:.2%}")
-        print(f"   [{po_num}] ⏱️  Analysis time: {analysis_time:.1f}s")
 
-        if decision.tokens_total > 0:
-            print(f"   [{po_num}] 🪙 Tokens: {decision.tokens_total:,} (input: {decision.tokens_input:,}, output: {decision.tokens_output:,})")
+async def process_po_group(group: list, accrual_engine: AccrualEngine, semaphore: asyncio.Semaphore,
+                           first_index: int, total: int) -> list:
+    """
+    Process a group of PO lines scored together in one call per model tier
 
-    return (po_line, decision, analysis_time)
+    Args:
+        group: List of (po_line, related_bills) tuples
+        accrual_engine: AccrualEngine instance
+        semaphore: Semaphore bounding the number of concurrent OpenAI requests
+        first_index: Index of the first PO line in the group
+        total: Total number of POs
+
+    Returns:
+        List of (po_line, decision, analysis_time) tuples in group order
+    """
+    async with semaphore:
+        last_index = first_index + len(group) - 1
+        print(f"\n[{first_index}-{last_index}/{total}] POs: {', '.join(str(po_line.get('PO_NUMBER')) for po_line, _ in group)}")
+        print("-" * 60)
+
+        decisions = await accrual_engine.analyze_po_group_async(group)
+
+    results = []
+    for (po_line, _), decision in zip(group, decisions):
+        print_decision(po_line, decision, decision.processing_time_seconds)
+        results.append((po_line, decision, decision.processing_time_seconds))
+
+    return results
+
+
+def print_decision(po_line: dict, decision, analysis_time: float):
+    """Print the console summary of one PO line's decision"""
+    po_num = po_line.get('PO_NUMBER')
 
+    if decision.needs_accrual:
+        print(f"   [{po_num}] ✅ ACCRUAL NEEDED")
+        print(f"   [{po_num}] 💰 Amount: {decision.accrual_amount:,.2f} {po_line.get('FOREIGN_CURRENCY', '')}")
+    else:
+        print(f"   [{po_num}] ⭕ No accrual needed")
 
-def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_workers: int = 3):
+    print(f"   [{po_num}] 📝 Reasoning: {decision.reasoning[:80]}...")
+    print(f"   [{po_num}] 🎯 Confidence: {decision.confidence_score:.2%}")
+    print(f"   [{po_num}] ⏱️  Analysis time: {analysis_time:.1f}s")
+
+    if decision.tokens_total > 0:
+        print(f"   [{po_num}] 🪙 Tokens: {decision.tokens_total:,} (input: {decision.tokens_input:,}, output: {decision.tokens_output:,})")
+
+
+async def analyze_po_lines(po_lines: list, bills_by_po: dict, accrual_engine: AccrualEngine,
+                           max_workers: int, group_size: int = 1) -> list:
+    """
+    Analyze all PO lines concurrently with at most max_workers OpenAI requests in flight
+
+    Args:
+        po_lines: PO lines to analyze
+        bills_by_po: Dictionary of bills grouped by PO
+        accrual_engine: AccrualEngine instance
+        max_workers: Maximum number of concurrent requests
+        group_size: PO lines scored per call (1 = one call per line)
+
+    Returns:
+        List of (po_line, decision, analysis_time) tuples, or exceptions, in completion order
+    """
+    semaphore = asyncio.Semaphore(max_workers)
+    if group_size > 1:
+        items = [(po_line, bills_by_po.get(po_line.get('PO_NUMBER'), [])) for po_line in po_lines]
+        tasks = []
+        first_index = 1
+        for group in accrual_engine.group_po_lines(items, k=group_size):
+            tasks.append(process_po_group(group, accrual_engine, semaphore, first_index, len(po_lines)))
+            first_index += len(group)
+    else:
+        tasks = [
+            process_single_po(po_line, bills_by_po, accrual_engine, semaphore, i, len(po_lines))
+            for i, po_line in enumerate(po_lines, 1)
+        ]
+
+    results = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                result = await next_done
+            except Exception as e:
+                results.append(e)
+                continue
+            if group_size > 1:
+                results.extend(result)
+            else:
+                results.append(result)
+    finally:
+        # The aiohttp session is bound to this event loop - close it before asyncio.run() returns
+        await accrual_engine.aclose()
+
+    return results
+
+
+def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_workers: int = 3,
+                         use_batch: bool = False, group_size: int = 1):
     """
     Run accrual analysis on PO lines
 
@@ -146,6 +227,8 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
         po_number: Optional specific PO to analyze
         analysis_month: Optional month to analyze for (e.g., "February 2025")
         max_workers: Number of parallel workers (default: 3)
+        use_batch: Submit all PO lines through the OpenAI Batch API instead of live requests
+        group_size: Score this many PO lines per live request (1 = one request per line)
     """
     # Start timing
     script_start_time = time.time()
@@ -161,7 +244,7 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
 
         # Initialize clients
         print("\n📊 Connecting to Snowflake...")
-        snowflake_client = SnowflakeDataClient()
+        snowflake_client = get_snowflake_client()
 
         print(f"🤖 Initializing AI Accrual Engine...")
         accrual_engine = AccrualEngine(current_month=analysis_month)
@@ -225,7 +308,13 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
         logger.info("Cleared CSV file for fresh run")
 
         print("\n" + "=" * 80)
-        print(f"🔬 ANALYZING PO LINES (Parallel workers: {max_workers})")
+        if use_batch:
+            mode = 'Batch API'
+        elif group_size > 1:
+            mode = f'Parallel workers: {max_workers}, {group_size} PO lines per call'
+        else:
+            mode = f'Parallel workers: {max_workers}'
+        print(f"🔬 ANALYZING PO LINES ({mode})")
         print("=" * 80)
 
         # Analyze PO lines in parallel
@@ -236,64 +325,66 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
         total_tokens_total = 0
         total_ai_time = 0.0
 
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_index = {}
-            for i, po_line in enumerate(po_lines, 1):
-                future = executor.submit(
-                    process_single_po,
-                    po_line,
-                    bills_by_po,
-                    accrual_engine,
-                    i,
-                    len(po_lines)
-                )
-                future_to_index[future] = i
-
-            # Collect results as they complete
-            for future in as_completed(future_to_index):
-                try:
-                    po_line, decision, analysis_time = future.result()
-                    po_num = po_line.get('PO_NUMBER')
-                    vendor = po_line.get('VENDOR_NAME', 'Unknown')
-
-                    # Update counters
-                    if decision.needs_accrual:
-                        total_accruals_needed += 1
-
-                    total_analyzed += 1
-                    total_tokens_input += decision.tokens_input
-                    total_tokens_output += decision.tokens_output
-                    total_tokens_total += decision.tokens_total
-                    total_ai_time += decision.processing_time_seconds
-
-                    # Add to results
-                    # Add single quote prefix to analysis_month to force Excel to treat as text
-                    analysis_month_text = f"'{accrual_engine.current_month}"
-
-                    results_data.append({
-                        'lookup_key': po_line.get('LOOKUP_KEY', ''),
-                        'po_number': po_num,
-                        'vendor_name': vendor,
-                        'gl_account': po_line.get('GL_ACCOUNT_NAME', ''),
-                        'description': po_line.get('DESCRIPTION', ''),
-                        'total_amount': po_line.get('TOTAL_AMOUNT_FOREIGN', ''),
-                        'billed_amount': po_line.get('BILLED_AMOUNT_FOREIGN', ''),
-                        'unbilled_amount': po_line.get('UNBILLED_AMOUNT_FOREIGN', ''),
-                        'currency': po_line.get('FOREIGN_CURRENCY', ''),
-                        'needs_accrual': decision.needs_accrual,
-                        'accrual_amount': decision.accrual_amount if decision.needs_accrual else 0,
-                        'short_summary': decision.short_summary,
-                        'reasoning': decision.reasoning,
-                        'confidence_score': decision.confidence_score,
-                        'analysis_month': analysis_month_text,
-                        'analyzed_at': decision.analyzed_at.isoformat()
-                    })
-
-                except Exception as e:
-                    logger.error(f"Error processing PO in parallel: {str(e)}")
-                    print(f"❌ Error processing a PO: {str(e)}")
+        if use_batch:
+            # Batch API: one upload, poll until done (can take up to 24h)
+            print(f"📦 Submitting {len(po_lines)} PO lines to the OpenAI Batch API (this may take a while)...")
+            items = [(po_line, bills_by_po.get(po_line.get('PO_NUMBER'), [])) for po_line in po_lines]
+            decisions = accrual_engine.submit_batch(items)
+            analysis_results = [
+                (po_line, decision, decision.processing_time_seconds)
+                for po_line, decision in zip(po_lines, decisions)
+            ]
+        else:
+            # Run all analyses on one event loop; max_workers bounds concurrent requests
+            analysis_results = asyncio.run(analyze_po_lines(po_lines, bills_by_po, accrual_engine, max_workers,
+                                                            group_size))
+
+        # Collect results in completion order
+        for result in analysis_results:
+            try:
+                if isinstance(result, Exception):
+                    raise result
+
+                po_line, decision, analysis_time = result
+                po_num = po_line.get('PO_NUMBER')
+                vendor = po_line.get('VENDOR_NAME', 'Unknown')
+
+                # Update counters
+                if decision.needs_accrual:
+                    total_accruals_needed += 1
+
+                total_analyzed += 1
+                total_tokens_input += decision.tokens_input
+                total_tokens_output += decision.tokens_output
+                total_tokens_total += decision.tokens_total
+                total_ai_time += decision.processing_time_seconds
+
+                # Add to results
+                # Add single quote prefix to analysis_month to force Excel to treat as text
+                analysis_month_text = f"'{accrual_engine.current_month}"
+
+                results_data.append({
+                    'lookup_key': po_line.get('LOOKUP_KEY', ''),
+                    'po_number': po_num,
+                    'vendor_name': vendor,
+                    'gl_account': po_line.get('GL_ACCOUNT_NAME', ''),
+                    'description': po_line.get('DESCRIPTION', ''),
+                    'total_amount': po_line.get('TOTAL_AMOUNT_FOREIGN', ''),
+                    'billed_amount': po_line.get('BILLED_AMOUNT_FOREIGN', ''),
+                    'unbilled_amount': po_line.get('UNBILLED_AMOUNT_FOREIGN', ''),
+                    'currency': po_line.get('FOREIGN_CURRENCY', ''),
+                    'needs_accrual': decision.needs_accrual,
+                    'accrual_amount': decision.accrual_amount if decision.needs_accrual else 0,
+                    'short_summary': decision.short_summary,
+                    'reasoning': decision.reasoning,
+                    'confidence_score': decision.confidence_score,
+                    'analysis_month': analysis_month_text,
+                    'analyzed_at': decision.analyzed_at.isoformat()
+                })
+
+            except Exception as e:
+                logger.error(f"Error processing PO in parallel: {str(e)}")
+                print(f"❌ Error processing a PO: {str(e)}")
 
         # Save results to CSV
         if results_data:
@@ -319,6 +410,8 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
         print(f"  Total PO lines found: {po_lines_before}")
         print(f"  Already analyzed (skipped): {skipped_count}")
         print(f"  Newly analyzed: {total_analyzed}")
+        if accrual_engine.cache is not None:
+            print(f"    - Answered from decision cache: {accrual_engine.cache_hits} (DECISION_CACHE_ENABLED)")
         print(f"  ")
         print(f"  Accruals needed: {total_accruals_needed}")
         print(f"  No accrual needed: {total_analyzed - total_accruals_needed}")
@@ -338,7 +431,7 @@ def run_accrual_analysis(po_number: str = None, analysis_month: str = None, max_
         print("🎯 Analysis completed!")
 
         logger.info(f"Accrual analysis completed: {total_analyzed} PO lines, {total_accruals_needed} accruals needed, "
-                   f"{total_tokens_total:,} tokens, {minutes}m {seconds}s")
+                   f"{accrual_engine.cache_hits} cached decisions, {total_tokens_total:,} tokens, {minutes}m {seconds}s")
 
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
@@ -352,6 +445,8 @@ if __name__ == "__main__":
     po_number = None
     analysis_month = None
     max_workers = 3  # Default: 3 parallel workers
+    use_batch = False
+    group_size = 1
 
     i = 1
     while i < len(sys.argv):
@@ -362,10 +457,17 @@ if __name__ == "__main__":
         elif arg == "--workers" and i + 1 < len(sys.argv):
             max_workers = int(sys.argv[i + 1])
             i += 2
+        elif arg == "--group" and i + 1 < len(sys.argv):
+            group_size = int(sys.argv[i + 1])
+            i += 2
+        elif arg == "--batch":
+            use_batch = True
+            i += 1
         elif not arg.startswith("--"):
             po_number = arg
             i += 1
         else:
             i += 1
 
-    run_accrual_analysis(po_number=po_number, analysis_month=analysis_month, max_workers=max_workers)
+    run_accrual_analysis(po_number=po_number, analysis_month=analysis_month, max_workers=max_workers,
+                         use_batch=use_batch, group_size=group_size)
@@ -6,6 +6,7 @@ Usage:
     python run_invoice_download.py                            # Download from Snowflake bill list (auto)
     python run_invoice_download.py BILL_ID                    # Download files for a single bill
     python run_invoice_download.py BILL_ID1 BILL_ID2 ...     # Download files for multiple bills
+    python run_invoice_download.py --workers 4                # Split bills across 4 browser sessions (one login)
     python run_invoice_download.py --test-connection          # Test connection only
 """
 
@@ -13,41 +14,49 @@ import sys
 import os
 from pathlib import Path
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 
-def test_single_bill(bill_id: str, headless: bool = False):
-    """Test downloading files for a single bill"""
+def test_single_bill(bill_id: str, headless: bool = False, downloader=None):
+    """
+    Test downloading files for a single bill
+
+    Pass a downloader opened with `with NetSuiteRPADownloader(...) as downloader:` to
+    reuse its logged-in browser when calling this for several bills in a row.
+    """
     from src.clients.netsuite_rpa_downloader import NetSuiteRPADownloader
 
     print(f"\n{'='*60}")
     print(f"Testing RPA download for bill: {bill_id}")
     print(f"{'='*60}\n")
 
-    downloader = NetSuiteRPADownloader(headless=headless, manual_login=True)
+    if downloader is None:
+        downloader = NetSuiteRPADownloader(headless=headless, manual_login=True)
     files = downloader.download_bill_invoices(bill_id)
 
     print(f"\n{'='*60}")
     print(f"✓ Downloaded {len(files)} file(s):")
     print(f"{'='*60}")
-    for file_path in files:
-        print(f"  - {file_path}")
-    print(f"{'='*60}\n")
+    sys.stdout.write("".join(f"  - {file_path}\n" for file_path in files) + f"{'='*60}\n\n")
 
     return files
 
 
-def test_multiple_bills(bill_ids: list, headless: bool = False):
-    """Test downloading files for multiple bills"""
+def test_multiple_bills(bill_ids: list, headless: bool = False, workers: int = None, downloader=None):
+    """
+    Test downloading files for multiple bills (workers: parallel browser sessions, default DOWNLOAD_WORKERS)
+
+    An already-open downloader (see test_single_bill) is reused instead of logging in again.
+    """
     from src.clients.netsuite_rpa_downloader import NetSuiteRPADownloader
 
     print(f"\n{'='*60}")
     print(f"Testing RPA download for {len(bill_ids)} bills")
     print(f"{'='*60}\n")
 
-    downloader = NetSuiteRPADownloader(headless=headless, manual_login=True)
+    if downloader is None:
+        downloader = NetSuiteRPADownloader(headless=headless, manual_login=True, workers=workers)
     results, stats = downloader.download_multiple_bills(bill_ids)
 
     # Print final summary at the very end for quick visibility
@@ -100,24 +109,22 @@ def test_with_netsuite_client(bill_id: str):
     print(f"\n{'='*60}")
     print(f"✓ Downloaded {len(files)} file(s) via NetSuiteClient:")
     print(f"{'='*60}")
-    for file_path in files:
-        print(f"  - {file_path}")
-    print(f"{'='*60}\n")
+    sys.stdout.write("".join(f"  - {file_path}\n" for file_path in files) + f"{'='*60}\n\n")
 
     return files
 
 
-def download_from_snowflake(headless: bool = False):
+def download_from_snowflake(headless: bool = False, workers: int = None):
     """Download invoices for all bills from Snowflake view"""
     from src.clients.netsuite_rpa_downloader import NetSuiteRPADownloader
-    from src.clients.snowflake_data_client import SnowflakeDataClient
+    from src.clients.snowflake_data_client import get_snowflake_client
 
     print(f"\n{'='*60}")
     print(f"Fetching Bill IDs from Snowflake")
     print(f"{'='*60}\n")
 
     try:
-        snowflake_client = SnowflakeDataClient()
+        snowflake_client = get_snowflake_client()
         bill_ids = snowflake_client.get_bills_to_download()
 
         if not bill_ids:
@@ -138,7 +145,7 @@ def download_from_snowflake(headless: bool = False):
             return {}
 
         # Download files
-        return test_multiple_bills(bill_ids, headless=headless)
+        return test_multiple_bills(bill_ids, headless=headless, workers=workers)
 
     except Exception as e:
         print(f"Error fetching bills from Snowflake: {str(e)}")
@@ -154,6 +161,8 @@ def main():
     parser.add_argument("--test-connection", action="store_true", help="Test connection only")
     parser.add_argument("--headless", action="store_true", help="Run browser in headless mode")
     parser.add_argument("--use-client", action="store_true", help="Test via NetSuiteClient wrapper")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel browser sessions for multiple bills (default: DOWNLOAD_WORKERS from .env)")
 
     args = parser.parse_args()
 
@@ -166,7 +175,7 @@ def main():
         # If no bill IDs provided, fetch from Snowflake
         if not args.bill_ids:
             print("No bill IDs provided - fetching from Snowflake...")
-            download_from_snowflake(headless=args.headless)
+            download_from_snowflake(headless=args.headless, workers=args.workers)
             return
 
         # Test with NetSuiteClient wrapper
@@ -180,7 +189,7 @@ def main():
         if len(args.bill_ids) == 1:
             test_single_bill(args.bill_ids[0], headless=args.headless)
         else:
-            test_multiple_bills(args.bill_ids, headless=args.headless)
+            test_multiple_bills(args.bill_ids, headless=args.headless, workers=args.workers)
 
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
@@ -6,22 +6,23 @@ Usage:
     python run_invoice_extraction.py                           # Uses Google Drive Bills folder (from .env)
     python run_invoice_extraction.py 26358814                  # Process specific bill folder
     python run_invoice_extraction.py path/to/invoice/folder    # Uses specified folder
-    python run_invoice_extraction.py --workers 5               # Use 5 parallel workers (default: 3)
+    python run_invoice_extraction.py --workers 5               # Extract 5 invoices concurrently (default: 3)
+    python run_invoice_extraction.py --batch                   # OpenAI Batch API (50% cheaper, up to 24h)
 """
 
 import sys
 import os
+import asyncio
 import csv
+import io
 import time
 import argparse
 import threading
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.utils.logger import setup_logger
 
@@ -31,201 +32,225 @@ logger = setup_logger(__name__)
 console_lock = threading.Lock()
 csv_lock = threading.Lock()
 
+# Supported invoice file types (matched case-insensitively against the lowercased suffix)
+INVOICE_EXTENSIONS = ('.pdf', '.xlsx', '.xls', '.docx', '.doc', '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.txt')
+_INVOICE_EXTENSION_SET = frozenset(INVOICE_EXTENSIONS)
 
-def process_single_invoice(file_path, bill_id, index, total, processor, processed_invoices, folder_path, INVOICES_DIR):
+# CSV rows are plain tuples in this column order (see _success_row / _status_row)
+CSV_FIELDNAMES = ('bill_id', 'file_name', 'is_invoice', 'invoice_number', 'invoice_date',
+                  'service_description', 'service_period', 'line_items_summary',
+                  'total_amount', 'tax_amount', 'net_amount', 'currency', 'confidence_score',
+                  'processing_time_seconds', 'file_path')
+
+SUMMARY_TEMPLATE = """
+{rule}
+📊 Processing Summary:
+  Total files found: {{total}}
+  Already processed (skipped): {{skipped}}
+  Newly processed: {{new}}
+  {{mode}}
+  Total execution time: {{minutes}}m {{seconds}}s
+{rule}""".format(rule="=" * 60)
+
+
+
+def _success_row(result, file_path, processing_time):
+    """CSV row (in CSV_FIELDNAMES order) for a successful extraction"""
+    # Add tab prefix to service_period to force Excel to treat it as text
+    service_period = f"'{result.service_period}" if result.service_period else ''
+    return (result.bill_id, file_path.name, result.is_invoice, result.invoice_number or '',
+            result.invoice_date or '', result.service_description or '', service_period,
+            result.line_items_summary or '', result.total_amount or '', result.tax_amount or '',
+            result.net_amount or '', result.currency or '', result.confidence_score,
+            round(processing_time, 1), result.file_path)
+
+
+def _status_row(bill_id, file_path, status, processing_time, message=''):
+    """CSV row (in CSV_FIELDNAMES order) for a FAILED/ERROR file - message goes in line_items_summary"""
+    return (bill_id, file_path.name, status, '', '', '', '', message, '', '', '', '', 0,
+            round(processing_time, 1), str(file_path))
+
+
+def list_invoice_files(directory):
+    """List non-hidden invoice files in directory (single scandir pass, one set lookup per entry)"""
+    with os.scandir(directory) as entries:
+        return [
+            Path(entry.path) for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in _INVOICE_EXTENSION_SET
+            and not entry.name.startswith('.') and entry.is_file()
+        ]
+
+
+def list_bill_folders(directory):
+    """List non-hidden subfolders of directory (DirEntry.is_dir uses the cached d_type, no extra stat)"""
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries if entry.is_dir() and not entry.name.startswith('.')]
+
+
+def print_invoice_header(file_path, bill_id, index, total, show_bill_id):
+    """Print the progress header for one file"""
+    with console_lock:
+        if show_bill_id:
+            print(f"\n🧾 [{index}/{total}] Bill {bill_id}: {file_path.name}")
+        else:
+            print(f"\n🧾 [{index}/{total}] {file_path.name}")
+        print("-" * 40)
+
+
+def handle_extraction_result(file_path, bill_id, result, processing_time):
     """
-    Process a single invoice file (for parallel execution)
+    Report one extraction and build its CSV row (files that are not invoices are deleted)
 
     Returns:
-        tuple: (result_dict, was_skipped, was_deleted, processing_time)
+        tuple: (csv_row, was_skipped, was_deleted, processing_time)
     """
-    # Check if already processed in Snowflake
-    record_key = (bill_id, file_path.name)
-    if record_key in processed_invoices:
+    if result:
+        # Check if document is actually an invoice
+        if not result.is_invoice:
+            with console_lock:
+                print("⚠️  NOT AN INVOICE!")
+                print(f"   This document is not an invoice - deleting file")
+                print(f"   Processing Time: {processing_time:.1f} seconds")
+
+            logger.warning(f"Document is not an invoice: Bill {bill_id}, File: {file_path.name}")
+            logger.info(f"Deleting non-invoice file: {file_path}")
+
+            # Delete the non-invoice file
+            try:
+                os.unlink(file_path)
+                with console_lock:
+                    print(f"   ✓ File deleted: {file_path.name}")
+                logger.info(f"Successfully deleted non-invoice file: {file_path.name}")
+            except Exception as delete_error:
+                with console_lock:
+                    print(f"   ❌ Could not delete file: {str(delete_error)}")
+                logger.error(f"Failed to delete non-invoice file {file_path.name}: {str(delete_error)}")
+
+            # Return that it was deleted (not added to results)
+            return None, False, True, processing_time
+
+        # Build the report in memory so it reaches stdout as one write (and is never interleaved)
+        report = io.StringIO()
+        print("✅ SUCCESS!", file=report)
+        print(f"   Is invoice: {result.is_invoice}", file=report)
+        print(f"   Invoice #: {result.invoice_number or 'N/A'}", file=report)
+        print(f"   Date: {result.invoice_date or 'N/A'}", file=report)
+        print(f"   Total (incl. tax): {result.total_amount or 'N/A'} {result.currency or 'N/A'}", file=report)
+        print(f"   Tax: {result.tax_amount or 'N/A'} {result.currency or 'N/A'}", file=report)
+        print(f"   Net (excl. tax): {result.net_amount or 'N/A'} {result.currency or 'N/A'}", file=report)
+        print(f"   Description: {result.service_description or 'N/A'}", file=report)
+        print(f"   Service Period: {result.service_period or 'N/A'}", file=report)
+        print(f"   Line Items: {result.line_items_summary or 'N/A'}", file=report)
+        print(f"   Confidence: {result.confidence_score:.2f}", file=report)
+        print(f"   Processing Time: {processing_time:.1f} seconds", file=report)
+        print(f"   File: {result.file_path}", file=report)
         with console_lock:
-            print(f"[{index}/{total}] Bill {bill_id}: {file_path.name}")
-            print("✓ Already processed in Snowflake. Skipping")
-        logger.info(f"Skipping already processed invoice: Bill {bill_id}, File: {file_path.name}")
-        return None, True, False, 0
+            sys.stdout.write(report.getvalue())
 
-    start_time = time.time()
+        # Lazy %-formatting: the message is only built if INFO is enabled
+        logger.info("Successfully processed invoice: Bill %s, File: %s, Invoice#: %s, Amount: %s %s, Confidence: %.2f",
+                    bill_id, file_path.name, result.invoice_number, result.net_amount, result.currency,
+                    result.confidence_score)
 
+        return _success_row(result, file_path, processing_time), False, False, processing_time
+
+    else:
+        with console_lock:
+            print("❌ FAILED: No data extracted")
+            print(f"   Processing Time: {processing_time:.1f} seconds")
+        logger.error(f"Failed to extract data from invoice: Bill {bill_id}, File: {file_path.name}")
+
+        return _status_row(bill_id, file_path, 'FAILED', processing_time), False, False, processing_time
+
+
+def handle_extraction_error(file_path, bill_id, error, processing_time):
+    """Report an extraction that raised and build its ERROR CSV row"""
     with console_lock:
-        if folder_path == INVOICES_DIR:
-            print(f"\n🧾 [{index}/{total}] Processing Bill {bill_id}: {file_path.name}")
-        else:
-            print(f"\n🧾 [{index}/{total}] Processing: {file_path.name}")
-        print("-" * 40)
+        print(f"❌ ERROR: {str(error)}")
+    logger.error(f"Exception during invoice processing: Bill {bill_id}, File: {file_path.name}, Error: {str(error)}")
+
+    return _status_row(bill_id, file_path, 'ERROR', processing_time, str(error)), False, False, processing_time
+
+
+async def process_invoices_concurrently(file_bill_pairs, processor, show_bill_id, max_concurrency, on_outcome):
+    """
+    Process all files through InvoiceProcessor.iter_invoice_results, with at most
+    max_concurrency OpenAI calls in flight while worker threads parse the next files
+
+    on_outcome(pair, outcome) is called as each (file_path, bill_id, index) pair finishes,
+    in completion order, with a (csv_row, was_skipped, was_deleted, processing_time) tuple.
+    """
+    total = len(file_bill_pairs)
+    invoices = [(str(file_path), bill_id) for file_path, bill_id, _ in file_bill_pairs]
 
     try:
-        # Process invoice
-        result = processor.process_invoice(str(file_path), bill_id)
-        processing_time = time.time() - start_time
+        async for position, result, processing_time in processor.iter_invoice_results(invoices, max_concurrency):
+            pair = file_bill_pairs[position]
+            file_path, bill_id, index = pair
+            print_invoice_header(file_path, bill_id, index, total, show_bill_id)
+            try:
+                outcome = handle_extraction_result(file_path, bill_id, result, processing_time)
+            except Exception as e:
+                outcome = handle_extraction_error(file_path, bill_id, e, processing_time)
+            on_outcome(pair, outcome)
+    finally:
+        # The async HTTP session is bound to this event loop
+        await processor.aclose()
 
-        if result:
-            # Check if document is actually an invoice
-            if not result.is_invoice:
-                with console_lock:
-                    print("⚠️  NOT AN INVOICE!")
-                    print(f"   This document is not an invoice - deleting file")
-                    print(f"   Processing Time: {processing_time:.1f} seconds")
 
-                logger.warning(f"Document is not an invoice: Bill {bill_id}, File: {file_path.name}")
-                logger.info(f"Deleting non-invoice file: {file_path}")
+def process_invoices_batch(file_bill_pairs, processor, on_outcome):
+    """
+    Extract all files in one OpenAI Batch API job (blocks until it finishes, up to 24h)
 
-                # Delete the non-invoice file
-                try:
-                    file_path.unlink()
-                    with console_lock:
-                        print(f"   ✓ File deleted: {file_path.name}")
-                    logger.info(f"Successfully deleted non-invoice file: {file_path.name}")
-                except Exception as delete_error:
-                    with console_lock:
-                        print(f"   ❌ Could not delete file: {str(delete_error)}")
-                    logger.error(f"Failed to delete non-invoice file {file_path.name}: {str(delete_error)}")
+    on_outcome(pair, outcome) is called once per (file_path, bill_id, index) pair with a
+    (csv_row, was_skipped, was_deleted, processing_time) tuple.
+    """
+    total = len(file_bill_pairs)
+    if not total:
+        return
 
-                # Return that it was deleted (not added to results)
-                return None, False, True, processing_time
+    print(f"📦 Submitting {total} invoices to the OpenAI Batch API (this may take a while)...")
+    start_time = time.time()
+    results = processor.submit_batch([(str(file_path), bill_id) for file_path, bill_id, _ in file_bill_pairs])
 
-            with console_lock:
-                print("✅ SUCCESS!")
-                print(f"   Is invoice: {result.is_invoice}")
-                print(f"   Invoice #: {result.invoice_number or 'N/A'}")
-                print(f"   Date: {result.invoice_date or 'N/A'}")
-                print(f"   Total (incl. tax): {result.total_amount or 'N/A'} {result.currency or 'N/A'}")
-                print(f"   Tax: {result.tax_amount or 'N/A'} {result.currency or 'N/A'}")
-                print(f"   Net (excl. tax): {result.net_amount or 'N/A'} {result.currency or 'N/A'}")
-                print(f"   Description: {result.service_description or 'N/A'}")
-                print(f"   Service Period: {result.service_period or 'N/A'}")
-                print(f"   Line Items: {result.line_items_summary or 'N/A'}")
-                print(f"   Confidence: {result.confidence_score:.2f}")
-                print(f"   Processing Time: {processing_time:.1f} seconds")
-                print(f"   File: {result.file_path}")
-
-            logger.info(f"Successfully processed invoice: Bill {bill_id}, File: {file_path.name}, Invoice#: {result.invoice_number}, Amount: {result.net_amount} {result.currency}, Confidence: {result.confidence_score:.2f}")
-
-            # Add tab prefix to service_period to force Excel to treat it as text
-            service_period_value = result.service_period or ''
-            if service_period_value:
-                service_period_value = f"'{service_period_value}"
-
-            result_dict = {
-                'bill_id': result.bill_id,
-                'file_name': file_path.name,
-                'is_invoice': result.is_invoice,
-                'invoice_number': result.invoice_number or '',
-                'invoice_date': result.invoice_date or '',
-                'service_description': result.service_description or '',
-                'service_period': service_period_value,
-                'line_items_summary': result.line_items_summary or '',
-                'total_amount': result.total_amount or '',
-                'tax_amount': result.tax_amount or '',
-                'net_amount': result.net_amount or '',
-                'currency': result.currency or '',
-                'confidence_score': result.confidence_score,
-                'processing_time_seconds': round(processing_time, 1),
-                'file_path': result.file_path
-            }
-
-            return result_dict, False, False, processing_time
+    # Batch requests have no individual timings - amortize the wall time across files
+    processing_time = (time.time() - start_time) / total
 
-        else:
-            with console_lock:
-                print("❌ FAILED: No data extracted")
-                print(f"   Processing Time: {processing_time:.1f} seconds")
-            logger.error(f"Failed to extract data from invoice: Bill {bill_id}, File: {file_path.name}")
-
-            result_dict = {
-                'bill_id': bill_id,
-                'file_name': file_path.name,
-                'is_invoice': 'FAILED',
-                'invoice_number': '',
-                'invoice_date': '',
-                'service_description': '',
-                'service_period': '',
-                'line_items_summary': '',
-                'total_amount': '',
-                'tax_amount': '',
-                'net_amount': '',
-                'currency': '',
-                'confidence_score': 0,
-                'processing_time_seconds': round(processing_time, 1),
-                'file_path': str(file_path)
-            }
-
-            return result_dict, False, False, processing_time
+    for pair, result in zip(file_bill_pairs, results):
+        file_path, bill_id, index = pair
+        print_invoice_header(file_path, bill_id, index, total, show_bill_id=True)
+        try:
+            outcome = handle_extraction_result(file_path, bill_id, result, processing_time)
+        except Exception as e:
+            outcome = handle_extraction_error(file_path, bill_id, e, processing_time)
+        on_outcome(pair, outcome)
 
-    except Exception as e:
-        processing_time = time.time() - start_time
-        with console_lock:
-            print(f"❌ ERROR: {str(e)}")
-        logger.error(f"Exception during invoice processing: Bill {bill_id}, File: {file_path.name}, Error: {str(e)}")
-
-        result_dict = {
-            'bill_id': bill_id,
-            'file_name': file_path.name,
-            'is_invoice': 'ERROR',
-            'invoice_number': '',
-            'invoice_date': '',
-            'service_description': '',
-            'service_period': '',
-            'line_items_summary': str(e),
-            'total_amount': '',
-            'tax_amount': '',
-            'net_amount': '',
-            'currency': '',
-            'confidence_score': 0,
-            'processing_time_seconds': round(processing_time, 1),
-            'file_path': str(file_path)
-        }
-
-        return result_dict, False, False, processing_time
-
-
-def run_invoice_extraction(max_workers=3):
+
+def run_invoice_extraction(max_workers=None, target=None, use_batch=False):
+    """
+    Extract invoice data for downloaded bill files and save it to CSV
+
+    Args:
+        max_workers: Invoices extracted concurrently (default: AppConfig.INVOICE_WORKERS)
+        target: Bill ID or folder path to process (default: every bill folder in INVOICES_DIR)
+        use_batch: Submit all new files through the OpenAI Batch API instead of live requests
+    """
     # Start timing
     script_start_time = time.time()
 
+    if max_workers is None:
+        from config.settings import AppConfig
+        max_workers = AppConfig.INVOICE_WORKERS
+
     print(f"🔧 Using {max_workers} parallel workers for invoice processing\n")
 
     try:
-        # Import and validate OpenAI first
-        import openai
-        from config.settings import OpenAIConfig
-        
-        # Check if OpenAI API key is configured
-        if not OpenAIConfig.API_KEY:
-            print("ERROR: OpenAI API key not found!")
-            print("   Please set OPENAI_API_KEY in your .env file")
-            return
-        
-        print("OpenAI API key found")
-        
-        # Check OpenAI version and initialize appropriately
-        print(f"OpenAI library version: {openai.__version__}")
-        
-        try:
-            # Try new OpenAI v1.x initialization
-            test_client = openai.OpenAI(api_key=OpenAIConfig.API_KEY)
-            print("OpenAI client (v1.x) initialized")
-        except Exception as e:
-            print(f"❌ OpenAI v1.x client error: {str(e)}")
-            print("🔧 Trying legacy initialization...")
-            try:
-                # Try older OpenAI v0.x initialization
-                openai.api_key = OpenAIConfig.API_KEY
-                print("🤖 Using legacy OpenAI (v0.x) setup ✅")
-            except Exception as e2:
-                print(f"❌ Legacy OpenAI setup also failed: {str(e2)}")
-                print("💡 You may need to update your OpenAI library:")
-                print("   pip install --upgrade openai")
-                return
-        
-        # Get folder path
-        from config.settings import INVOICES_DIR
+        # Config is light; openai and the processor are imported only once there are files to extract
+        from config.settings import OpenAIConfig, INVOICES_DIR, CSV_RESULTS_DIR
 
-        if len(sys.argv) > 1:
-            arg = sys.argv[1]
+        # Get folder path
+        if target:
+            arg = target
             # Check if argument is a bill ID (numeric) or a path
             if arg.isdigit():
                 # Argument is a bill ID - use Google Drive folder
@@ -240,52 +265,81 @@ def run_invoice_extraction(max_workers=3):
             folder_path = INVOICES_DIR
             print(f"Testing all bills from Google Drive")
 
+        # Loop-invariant: scanning every bill subfolder, or a single bill/custom folder
+        scanning_all_bills = folder_path == INVOICES_DIR and not target
+        single_bill_id = folder_path.name if target and target.isdigit() else None
+        show_bill_id = folder_path == INVOICES_DIR
+
         if not folder_path.exists():
             print(f"❌ Folder not found: {folder_path}")
-            if len(sys.argv) > 1 and sys.argv[1].isdigit():
-                print(f"   Bill {sys.argv[1]} has no downloaded invoices yet")
-                print(f"   Download files first: python run_invoice_download.py {sys.argv[1]}")
+            if target and target.isdigit():
+                print(f"   Bill {target} has no downloaded invoices yet")
+                print(f"   Download files first: python run_invoice_download.py {target}")
             else:
                 print(f"   Make sure INVOICES_DIR is configured in .env")
             return
         
-        # Find invoice files
-        invoice_extensions = ['.pdf', '.xlsx', '.xls', '.docx', '.doc', '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.txt']
-        invoice_files = set()  # Use set to avoid duplicates
+        # Find invoice files (one scandir pass per folder, extension checked case-insensitively)
 
         # Check if we're in a specific bill folder or the main Bills folder
-        if folder_path == INVOICES_DIR and len(sys.argv) <= 1:
+        if scanning_all_bills:
             # Main Bills folder - search all bill subdirectories
             print(f"Searching all bill folders in {folder_path}...")
-            for ext in invoice_extensions:
-                invoice_files.update(folder_path.glob(f"*/*{ext}"))
-                invoice_files.update(folder_path.glob(f"*/*{ext.upper()}"))
+            invoice_files = sorted(
+                file_path
+                for bill_dir in list_bill_folders(folder_path)
+                for file_path in list_invoice_files(bill_dir)
+            )
         else:
             # Specific bill folder or custom path - search just this folder
-            for ext in invoice_extensions:
-                invoice_files.update(folder_path.glob(f"*{ext}"))
-                invoice_files.update(folder_path.glob(f"*{ext.upper()}"))
-
-        invoice_files = list(invoice_files)  # Convert back to list
+            invoice_files = sorted(list_invoice_files(folder_path))
         
         if not invoice_files:
             print(f"❌ No invoice files found in: {folder_path}")
-            print(f"   Supported formats: {', '.join(invoice_extensions)}")
+            print(f"   Supported formats: {', '.join(INVOICE_EXTENSIONS)}")
             return
         
         print(f"📁 Found {len(invoice_files)} files in {folder_path}")
         logger.info(f"Found {len(invoice_files)} files in {folder_path}")
-        print("📄 Files detected:")
-        for file in invoice_files:
+        # File listing goes out as one stdout write and one log record, however many files there are
+        if scanning_all_bills:
             # Show bill ID if scanning all bills
-            if folder_path == INVOICES_DIR and len(sys.argv) <= 1:
-                bill_id = file.parent.name
-                print(f"   - Bill {bill_id}: {file.name} ({file.suffix})")
-                logger.info(f"File detected - Bill {bill_id}: {file.name} ({file.suffix})")
-            else:
-                print(f"   - {file.name} ({file.suffix})")
-                logger.info(f"File detected: {file.name} ({file.suffix})")
-        print("=" * 60)
+            file_lines = [f"Bill {file.parent.name}: {file.name} ({file.suffix})" for file in invoice_files]
+        else:
+            file_lines = [f"{file.name} ({file.suffix})" for file in invoice_files]
+        sys.stdout.write("📄 Files detected:\n" + "".join(f"   - {line}\n" for line in file_lines) + "=" * 60 + "\n")
+        logger.info("Files detected:" + "".join(f"\n  - {line}" for line in file_lines))
+        
+        # Import and validate OpenAI
+        import openai
+        
+        # Check if OpenAI API key is configured
+        if not OpenAIConfig.API_KEY:
+            print("ERROR: OpenAI API key not found!")
+            print("   Please set OPENAI_API_KEY in your .env file")
+            return
+        
+        print("OpenAI API key found")
+        
+        # Check OpenAI version and initialize appropriately
+        print(f"OpenAI library version: {openai.__version__}")
+        
+        try:
+            # Try new OpenAI v1.x initialization
+            test_client = openai.OpenAI(api_key=OpenAIConfig.API_KEY)
+            print("OpenAI client (v1.x) initialized")
+        except Exception as e:
+            print(f"❌ OpenAI v1.x client error: {str(e)}")
+            print("🔧 Trying legacy initialization...")
+            try:
+                # Try older OpenAI v0.x initialization
+                openai.api_key = OpenAIConfig.API_KEY
+                print("🤖 Using legacy OpenAI (v0.x) setup ✅")
+            except Exception as e2:
+                print(f"❌ Legacy OpenAI setup also failed: {str(e2)}")
+                print("💡 You may need to update your OpenAI library:")
+                print("   pip install --upgrade openai")
+                return
         
         # Initialize processor 
         try:
@@ -296,77 +350,78 @@ def run_invoice_extraction(max_workers=3):
             return
         
         # Prepare CSV output
-        from config.settings import CSV_RESULTS_DIR
         csv_path = CSV_RESULTS_DIR / "invoice_extraction_results.csv"
-        results_data = []
         newly_processed_count = 0
 
-        # Clear CSV file at start of each run (fresh start)
-        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            fieldnames = ['bill_id', 'file_name', 'is_invoice', 'invoice_number', 'invoice_date',
-                         'service_description', 'service_period', 'line_items_summary',
-                         'total_amount', 'tax_amount', 'net_amount', 'currency', 'confidence_score',
-                         'processing_time_seconds', 'file_path']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-        logger.info("Cleared CSV file for fresh run")
-
-        # Load existing processed invoices from Snowflake (single query at startup)
+        # Prepare bill IDs for all files
+        file_bill_pairs = []
+        for i, file_path in enumerate(invoice_files, 1):
+            # Interned so the processed-invoices lookup compares bill IDs by identity
+            bill_id = sys.intern(file_path.parent.name if scanning_all_bills else (single_bill_id or f"TEST_{i:03d}"))
+            file_bill_pairs.append((file_path, bill_id, i))
+
+        # Check just these (bill_id, file_name) pairs against Snowflake (batched IN lookup at startup)
         print("🔍 Checking Snowflake for already processed invoices...")
         logger.info("Querying Snowflake for processed invoices")
 
         try:
-            from src.clients.snowflake_data_client import SnowflakeDataClient
-            snowflake_client = SnowflakeDataClient()
-            processed_invoices = snowflake_client.get_processed_invoices()
-            print(f"📋 Loaded {len(processed_invoices)} already processed invoices from Snowflake")
-            logger.info(f"Loaded {len(processed_invoices)} processed invoices from Snowflake")
+            from src.clients.snowflake_data_client import get_snowflake_client
+            snowflake_client = get_snowflake_client()
+            processed_invoices = snowflake_client.get_processed_invoices_for(
+                (bill_id, file_path.name) for file_path, bill_id, _ in file_bill_pairs
+            )
+            print(f"📋 Found {len(processed_invoices)} already processed invoices in Snowflake")
         except Exception as e:
             print(f"⚠️  Could not connect to Snowflake: {str(e)}")
             print(f"   Falling back to local CSV check only")
             logger.warning(f"Could not load from Snowflake, using empty set: {str(e)}")
-            processed_invoices = set()
+            processed_invoices = frozenset()
             snowflake_client = None
 
-        # Prepare bill IDs for all files
-        file_bill_pairs = []
-        for i, file_path in enumerate(invoice_files, 1):
-            if folder_path == INVOICES_DIR and len(sys.argv) <= 1:
-                bill_id = file_path.parent.name
-            else:
-                bill_id = folder_path.name if len(sys.argv) > 1 and sys.argv[1].isdigit() else f"TEST_{i:03d}"
-            file_bill_pairs.append((file_path, bill_id, i))
-
-        # Process files in parallel
+        # Drop files already in Snowflake up front - they cost one set lookup, not a progress block each
+        pending_pairs = [
+            (file_path, bill_id, index)
+            for index, (file_path, bill_id, _) in enumerate(
+                (pair for pair in file_bill_pairs if (pair[1], pair[0].name) not in processed_invoices), 1
+            )
+        ]
+        already_processed_count = len(file_bill_pairs) - len(pending_pairs)
+        if already_processed_count:
+            print(f"✓ Skipping {already_processed_count} files already processed in Snowflake")
+            logger.info(f"Skipped {already_processed_count} already-processed files")
+
+        # Process files in parallel (or as one Batch API job)
         print(f"\n{'='*80}")
-        print(f"🔬 PROCESSING {len(invoice_files)} INVOICES (Parallel workers: {max_workers})")
+        print(f"🔬 PROCESSING {len(pending_pairs)} INVOICES ({'Batch API' if use_batch else f'Parallel workers: {max_workers}'})")
         print(f"{'='*80}\n")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_file = {
-                executor.submit(
-                    process_single_invoice,
-                    file_path, bill_id, index, len(invoice_files),
-                    processor, processed_invoices, folder_path, INVOICES_DIR
-                ): (file_path, bill_id, index)
-                for file_path, bill_id, index in file_bill_pairs
-            }
-
-            # Collect results as they complete
-            for future in as_completed(future_to_file):
-                file_path, bill_id, index = future_to_file[future]
-                try:
-                    result_dict, was_skipped, was_deleted, processing_time = future.result()
-
-                    if not was_skipped and not was_deleted and result_dict:
-                        results_data.append(result_dict)
-                        newly_processed_count += 1
-
-                except Exception as exc:
+        # CSV is rewritten each run (fresh start); rows are streamed as files finish, so the
+        # results of an interrupted run are kept and nothing is buffered in memory
+        with open(csv_path, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(CSV_FIELDNAMES)
+            logger.info("Cleared CSV file for fresh run")
+
+            def record_outcome(pair, outcome):
+                nonlocal newly_processed_count
+                file_path, bill_id, index = pair
+                if isinstance(outcome, Exception):
                     with console_lock:
-                        print(f"❌ [{index}/{len(invoice_files)}] Exception for {file_path.name}: {exc}")
-                    logger.error(f"Exception in parallel processing for {file_path.name}: {exc}")
+                        print(f"❌ [{index}/{len(pending_pairs)}] Exception for {file_path.name}: {outcome}")
+                    logger.error(f"Exception in parallel processing for {file_path.name}: {outcome}")
+                    return
+
+                csv_row, was_skipped, was_deleted, processing_time = outcome
+                if not was_skipped and not was_deleted and csv_row:
+                    writer.writerow(csv_row)
+                    newly_processed_count += 1
+
+            if use_batch:
+                process_invoices_batch(pending_pairs, processor, record_outcome)
+            else:
+                asyncio.run(process_invoices_concurrently(
+                    pending_pairs, processor, show_bill_id, max_workers, record_outcome
+                ))
 
         # Calculate and display total execution time
         total_execution_time = time.time() - script_start_time
@@ -377,39 +432,17 @@ def run_invoice_extraction(max_workers=3):
         total_files_found = len(invoice_files)
         skipped_count = total_files_found - newly_processed_count
 
-        # Write results to CSV only if there are new results
+        print(SUMMARY_TEMPLATE.format(
+            total=total_files_found, skipped=skipped_count, new=newly_processed_count,
+            mode='Mode: OpenAI Batch API' if use_batch else f'Parallel workers: {max_workers}',
+            minutes=minutes, seconds=seconds
+        ))
         if newly_processed_count > 0:
-            with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['bill_id', 'file_name', 'is_invoice', 'invoice_number', 'invoice_date',
-                             'service_description', 'service_period', 'line_items_summary',
-                             'total_amount', 'tax_amount', 'net_amount', 'currency', 'confidence_score',
-                             'processing_time_seconds', 'file_path']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(results_data)
-
-            print("\n" + "=" * 60)
-            print(f"📊 Processing Summary:")
-            print(f"  Total files found: {total_files_found}")
-            print(f"  Already processed (skipped): {skipped_count}")
-            print(f"  Newly processed: {newly_processed_count}")
-            print(f"  Parallel workers: {max_workers}")
-            print(f"  Total execution time: {minutes}m {seconds}s")
-            print("=" * 60)
             print(f"\n✓ Results saved to CSV: {csv_path.absolute()}")
             print(f"\n💡 Next step: Review the CSV and then upload to Snowflake using:")
             print(f"   python upload_to_snowflake.py")
             logger.info(f"Summary: {total_files_found} files found, {skipped_count} skipped, {newly_processed_count} newly processed in {minutes}m {seconds}s")
-
         else:
-            print("\n" + "=" * 60)
-            print(f"📊 Processing Summary:")
-            print(f"  Total files found: {total_files_found}")
-            print(f"  Already processed (skipped): {skipped_count}")
-            print(f"  Newly processed: {newly_processed_count}")
-            print(f"  Parallel workers: {max_workers}")
-            print(f"  Total execution time: {minutes}m {seconds}s")
-            print("=" * 60)
             print(f"\n✓ All invoices already in Snowflake database")
             logger.info(f"Summary: {total_files_found} files found, all already in Snowflake, completed in {minutes}m {seconds}s")
 
@@ -425,8 +458,11 @@ def run_invoice_extraction(max_workers=3):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process invoices with AI")
     parser.add_argument("bill_id", nargs="?", help="Specific bill ID or path to process")
-    parser.add_argument("--workers", type=int, default=3, help="Number of parallel workers (default: 3)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Use the OpenAI Batch API (50%% cheaper, results can take up to 24h)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of invoices extracted concurrently (default: INVOICE_WORKERS from .env, or 3)")
     args = parser.parse_args()
 
     # Pass workers to function
-    run_invoice_extraction(max_workers=args.workers)
\ No newline at end of file
+    run_invoice_extraction(max_workers=args.workers, target=args.bill_id, use_batch=args.batch)
\ No newline at end of file
@@ -1,8 +1,9 @@
 # Simplified imports - RPA for downloads, Snowflake for data
-from .snowflake_data_client import SnowflakeDataClient
+from .snowflake_data_client import SnowflakeDataClient, get_snowflake_client
 from .netsuite_rpa_downloader import NetSuiteRPADownloader
 
 __all__ = [
     "SnowflakeDataClient",
+    "get_snowflake_client",
     "NetSuiteRPADownloader"
 ]
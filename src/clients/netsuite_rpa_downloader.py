@@ -9,13 +9,16 @@ and navigates to bill pages to download attached files.
 from playwright.sync_api import sync_playwright, Page, Download
 import time
 import os
+import sys
 import csv
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
-from config.settings import NetSuiteConfig, INVOICES_DIR, CSV_RESULTS_DIR
+from config.settings import NetSuiteConfig, AppConfig, INVOICES_DIR, CSV_RESULTS_DIR
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -33,16 +36,18 @@ class DownloadedFile:
 class NetSuiteRPADownloader:
     """Downloads invoice files from NetSuite using browser automation"""
 
-    def __init__(self, headless: bool = True, manual_login: bool = True):
+    def __init__(self, headless: bool = True, manual_login: bool = True, workers: Optional[int] = None):
         """
         Initialize the RPA downloader
 
         Args:
             headless: Whether to run browser in headless mode (False for debugging)
             manual_login: Whether to wait for manual Okta login (True for security)
+            workers: Browser sessions used by download_multiple_bills (default: AppConfig.DOWNLOAD_WORKERS)
         """
         self.headless = headless
         self.manual_login = manual_login
+        self.workers = max(1, workers or AppConfig.DOWNLOAD_WORKERS)
         self.base_url = f"https://{NetSuiteConfig.ACCOUNT_ID}.app.netsuite.com" if NetSuiteConfig.ACCOUNT_ID else None
 
         # Okta login URL - configure this in your .env
@@ -51,7 +56,76 @@ class NetSuiteRPADownloader:
             "https://purestorage.okta.com/home/netsuite/0oa17egaalm4fLsk81d8/82"
         )
 
-        logger.info(f"NetSuite RPA Downloader initialized (headless={headless}, manual_login={manual_login})")
+        # Browser session kept open between calls inside `with downloader:` (see __enter__)
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+
+        logger.info(f"NetSuite RPA Downloader initialized (headless={headless}, manual_login={manual_login}, "
+                    f"workers={self.workers})")
+
+    def __enter__(self):
+        """
+        Launch the browser and log in once; downloads inside the with-block reuse this session
+
+        Raises:
+            RuntimeError: If the NetSuite login fails
+        """
+        self._playwright = sync_playwright().start()
+        try:
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+            self._context = self._browser.new_context(accept_downloads=True)
+            self._page = self._context.new_page()
+            if not self._login_to_netsuite(self._page):
+                raise RuntimeError("Failed to login to NetSuite")
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the browser session opened by __enter__ (no-op if none is open)"""
+        browser, playwright = self._browser, self._playwright
+        self._playwright = self._browser = self._context = self._page = None
+
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {str(e)}")
+        if playwright is not None:
+            playwright.stop()
+            logger.info("✓ Browser session closed")
+
+    @contextmanager
+    def _logged_in_session(self):
+        """
+        Yield (context, page) for a logged-in NetSuite session
+
+        Reuses the session opened by __enter__ if there is one; otherwise launches a
+        browser, logs in and closes it afterwards. Yields None if the login fails.
+        """
+        if self._page is not None:
+            yield self._context, self._page
+            return
+
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=self.headless)
+            try:
+                context = browser.new_context(accept_downloads=True)
+                page = context.new_page()
+                if self._login_to_netsuite(page):
+                    yield context, page
+                else:
+                    logger.error("Failed to login to NetSuite")
+                    yield None
+            finally:
+                browser.close()
+                logger.info("✓ Browser closed automatically")
 
     def download_bill_invoices(self, bill_id: str, skip_if_exists: bool = True) -> List[str]:
         """
@@ -67,28 +141,23 @@ class NetSuiteRPADownloader:
         try:
             # Check if bill folder already exists with files
             if skip_if_exists:
-                bill_dir = INVOICES_DIR / bill_id
-                if bill_dir.exists() and any(bill_dir.iterdir()):
+                existing_files = self._existing_bill_files(bill_id)
+                if existing_files is not None:
                     logger.info(f"✓ Invoices for bill {bill_id} have already been downloaded")
-                    logger.info(f"  Folder: {bill_dir}")
+                    logger.info(f"  Folder: {INVOICES_DIR / bill_id}")
                     # Return existing files
-                    existing_files = [str(f) for f in bill_dir.iterdir() if f.is_file()]
                     logger.info(f"  Found {len(existing_files)} existing file(s)")
                     return existing_files
 
             logger.info(f"Starting download process for bill {bill_id}")
 
-            with sync_playwright() as p:
-                # Launch browser
-                browser = p.chromium.launch(headless=self.headless)
-                context = browser.new_context(accept_downloads=True)
-                page = context.new_page()
+            reusing_session = self._page is not None
 
-                # Login to NetSuite via Okta
-                if not self._login_to_netsuite(page):
-                    logger.error("Failed to login to NetSuite")
-                    browser.close()
+            # Login to NetSuite via Okta (or reuse the session opened by `with downloader:`)
+            with self._logged_in_session() as session:
+                if session is None:
                     return []
+                _, page = session
 
                 # Navigate to bill page
                 bill_url = self._get_bill_url(bill_id)
@@ -115,17 +184,16 @@ class NetSuiteRPADownloader:
                     logger.info(f"✓ Successfully downloaded {len(downloaded_files)} file(s) to:")
                     logger.info(f"  {INVOICES_DIR / bill_id}")
                     logger.info("=" * 60)
-                    for filepath in downloaded_files:
-                        logger.info(f"  - {os.path.basename(filepath)}")
+                    logger.info("".join(f"\n  - {os.path.basename(filepath)}" for filepath in downloaded_files))
                 else:
                     logger.warning("✗ No files were downloaded successfully")
 
-                # Wait for user before closing browser
-                logger.info("\nBrowser will stay open so you can inspect...")
-                logger.info("Press ENTER when you want to close the browser...")
-                input()
+                # Wait for user before closing a one-off browser (a shared session stays open anyway)
+                if not reusing_session:
+                    logger.info("\nBrowser will stay open so you can inspect...")
+                    logger.info("Press ENTER when you want to close the browser...")
+                    input()
 
-                browser.close()
                 return downloaded_files
 
         except Exception as e:
@@ -134,7 +202,10 @@ class NetSuiteRPADownloader:
 
     def download_multiple_bills(self, bill_ids: List[str], skip_if_exists: bool = True) -> tuple[Dict[str, List[str]], Dict]:
         """
-        Download invoice files for multiple bills in a single browser session
+        Download invoice files for multiple bills after a single login
+
+        With workers > 1 the bills are split across that many browser sessions; the extra
+        sessions reuse the logged-in session's cookies, so login still happens once.
 
         Args:
             bill_ids: List of NetSuite bill IDs
@@ -159,10 +230,9 @@ class NetSuiteRPADownloader:
             # Check which bills already have files
             if skip_if_exists:
                 for bill_id in bill_ids:
-                    bill_dir = INVOICES_DIR / bill_id
-                    if bill_dir.exists() and any(bill_dir.iterdir()):
+                    existing_files = self._existing_bill_files(bill_id)
+                    if existing_files is not None:
                         logger.info(f"✓ Invoices for bill {bill_id} already downloaded - skipping")
-                        existing_files = [str(f) for f in bill_dir.iterdir() if f.is_file()]
                         results[bill_id] = existing_files
                         skipped_bills.append(bill_id)
                     else:
@@ -186,15 +256,9 @@ class NetSuiteRPADownloader:
 
             logger.info(f"Downloading {len(bills_to_download)} new bills (skipped {len(skipped_bills)})")
 
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=self.headless)
-                context = browser.new_context(accept_downloads=True)
-                page = context.new_page()
-
-                # Login once for all bills
-                if not self._login_to_netsuite(page):
-                    logger.error("Failed to login to NetSuite")
-                    browser.close()
+            # Login once for all bills (or reuse the session opened by `with downloader:`)
+            with self._logged_in_session() as session:
+                if session is None:
                     stats = {
                         'total_bills': len(bill_ids),
                         'skipped_bills': len(skipped_bills),
@@ -206,59 +270,25 @@ class NetSuiteRPADownloader:
                         'total_time_formatted': '0m 0s'
                     }
                     return results, stats
+                context, page = session
+
+                # Download files for each bill that needs downloading (this session takes the first shard)
+                shards = [bills_to_download[i::self.workers]
+                          for i in range(min(self.workers, len(bills_to_download)))]
+                if len(shards) > 1:
+                    logger.info(f"Downloading with {len(shards)} parallel browser sessions")
+                    storage_state = context.storage_state()
+                    with ThreadPoolExecutor(max_workers=len(shards) - 1, thread_name_prefix="rpa") as pool:
+                        futures = [pool.submit(self._download_bills_in_new_session, shard, storage_state)
+                                   for shard in shards[1:]]
+                        shard_outcomes = [self._download_bills(page, shards[0])]
+                        shard_outcomes.extend(future.result() for future in futures)
+                else:
+                    shard_outcomes = [self._download_bills(page, bills_to_download)]
 
-                # Download files for each bill that needs downloading
-                for bill_id in bills_to_download:
-                    max_retries = 3
-                    retry_count = 0
-                    success = False
-
-                    while retry_count < max_retries and not success:
-                        try:
-                            if retry_count > 0:
-                                logger.info(f"Retry {retry_count}/{max_retries} for bill {bill_id}")
-                                time.sleep(3)  # Wait before retry
-
-                            bill_url = self._get_bill_url(bill_id)
-                            logger.info(f"Processing bill {bill_id}: {bill_url}")
-
-                            # Navigate with retry logic
-                            page.goto(bill_url, wait_until="domcontentloaded", timeout=60000)
-                            time.sleep(2)  # Wait for page to stabilize
-                            page.wait_for_load_state("networkidle", timeout=30000)
-
-                            downloaded_files = self._download_files_from_page(page, bill_id)
-                            results[bill_id] = downloaded_files
-
-                            logger.info(f"✓ Downloaded {len(downloaded_files)} files for bill {bill_id}")
-                            success = True
-
-                            # Wait 1 second before next bill to avoid rate limiting
-                            time.sleep(1)
-
-                        except Exception as e:
-                            retry_count += 1
-                            error_msg = str(e)
-                            logger.error(f"Error processing bill {bill_id} (attempt {retry_count}/{max_retries}): {error_msg}")
-
-                            if retry_count >= max_retries:
-                                logger.error(f"❌ Failed to download bill {bill_id} after {max_retries} attempts")
-                                results[bill_id] = []
-                                failed_downloads.append({
-                                    'bill_id': bill_id,
-                                    'error': error_msg,
-                                    'files_downloaded': 0
-                                })
-                            else:
-                                logger.info(f"⏳ Will retry bill {bill_id}...")
-
-                    # Check if download was successful but resulted in 0 files
-                    if success and bill_id in results and len(results[bill_id]) == 0:
-                        failed_downloads.append({
-                            'bill_id': bill_id,
-                            'error': 'No files found',
-                            'files_downloaded': 0
-                        })
+                for shard_results, shard_failures in shard_outcomes:
+                    results.update(shard_results)
+                    failed_downloads.extend(shard_failures)
 
                 # Calculate total time
                 end_time = time.time()
@@ -280,20 +310,18 @@ class NetSuiteRPADownloader:
                 logger.info(f"  Total time: {minutes}m {seconds}s")
                 logger.info("=" * 60)
 
-                for bill_id, files in results.items():
-                    status = "✓ Skipped" if bill_id in skipped_bills else "✓ Downloaded"
-                    logger.info(f"\n{status} - Bill {bill_id}: {len(files)} file(s)")
-                    for file_path in files:
-                        logger.info(f"  - {os.path.basename(file_path)}")
+                # One log record for the whole per-bill listing instead of one per bill and file
+                skipped_set = set(skipped_bills)
+                logger.info("".join(
+                    f"\n{'✓ Skipped' if bill_id in skipped_set else '✓ Downloaded'} - Bill {bill_id}: {len(files)} file(s)"
+                    + "".join(f"\n  - {os.path.basename(file_path)}" for file_path in files)
+                    for bill_id, files in results.items()
+                ))
 
                 # Save failed downloads to CSV if any
                 if failed_downloads:
                     self._save_failed_downloads_csv(failed_downloads)
 
-                # Close browser automatically
-                browser.close()
-                logger.info("\n✓ Browser closed automatically")
-
             # Prepare statistics dictionary
             stats = {
                 'total_bills': len(bill_ids),
@@ -322,6 +350,120 @@ class NetSuiteRPADownloader:
             }
             return results, stats
 
+    def _existing_bill_files(self, bill_id: str) -> Optional[List[str]]:
+        """
+        List the files already downloaded for a bill in one directory scan
+
+        Returns:
+            Paths of the files in INVOICES_DIR/{bill_id}, or None if the folder is missing or empty
+        """
+        try:
+            with os.scandir(INVOICES_DIR / bill_id) as entries:
+                entries = list(entries)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        if not entries:
+            return None
+        return [entry.path for entry in entries if entry.is_file()]
+
+    def _download_bills(self, page: Page, bill_ids: List[str]) -> Tuple[Dict[str, List[str]], List[Dict]]:
+        """
+        Download files for each bill in turn on an already logged-in page
+
+        Args:
+            page: Playwright page object with an authenticated NetSuite session
+            bill_ids: NetSuite bill IDs
+
+        Returns:
+            Tuple of (results_dict mapping bill_id to downloaded file paths, failed_downloads list)
+        """
+        results = {}
+        failed_downloads = []
+
+        for bill_id in bill_ids:
+            max_retries = 3
+            retry_count = 0
+            success = False
+
+            while retry_count < max_retries and not success:
+                try:
+                    if retry_count > 0:
+                        logger.info(f"Retry {retry_count}/{max_retries} for bill {bill_id}")
+                        time.sleep(3)  # Wait before retry
+
+                    bill_url = self._get_bill_url(bill_id)
+                    logger.info(f"Processing bill {bill_id}: {bill_url}")
+
+                    # Navigate with retry logic
+                    page.goto(bill_url, wait_until="domcontentloaded", timeout=60000)
+                    time.sleep(2)  # Wait for page to stabilize
+                    page.wait_for_load_state("networkidle", timeout=30000)
+
+                    downloaded_files = self._download_files_from_page(page, bill_id)
+                    results[bill_id] = downloaded_files
+
+                    logger.info(f"✓ Downloaded {len(downloaded_files)} files for bill {bill_id}")
+                    success = True
+
+                    # Wait 1 second before next bill to avoid rate limiting
+                    time.sleep(1)
+
+                except Exception as e:
+                    retry_count += 1
+                    error_msg = str(e)
+                    logger.error(f"Error processing bill {bill_id} (attempt {retry_count}/{max_retries}): {error_msg}")
+
+                    if retry_count >= max_retries:
+                        logger.error(f"❌ Failed to download bill {bill_id} after {max_retries} attempts")
+                        results[bill_id] = []
+                        failed_downloads.append({
+                            'bill_id': bill_id,
+                            'error': error_msg,
+                            'files_downloaded': 0
+                        })
+                    else:
+                        logger.info(f"⏳ Will retry bill {bill_id}...")
+
+            # Check if download was successful but resulted in 0 files
+            if success and bill_id in results and len(results[bill_id]) == 0:
+                failed_downloads.append({
+                    'bill_id': bill_id,
+                    'error': 'No files found',
+                    'files_downloaded': 0
+                })
+
+        return results, failed_downloads
+
+    def _download_bills_in_new_session(self, bill_ids: List[str],
+                                       storage_state: Dict) -> Tuple[Dict[str, List[str]], List[Dict]]:
+        """
+        Download bills in a separate browser seeded with an authenticated session (runs in a worker thread)
+
+        Args:
+            bill_ids: NetSuite bill IDs for this session
+            storage_state: Cookies/local storage captured from the logged-in context
+
+        Returns:
+            Tuple of (results_dict, failed_downloads) as returned by _download_bills
+        """
+        try:
+            # Playwright's sync API is per-thread, so each worker starts its own instance
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=self.headless)
+                try:
+                    context = browser.new_context(accept_downloads=True, storage_state=storage_state)
+                    return self._download_bills(context.new_page(), bill_ids)
+                finally:
+                    browser.close()
+
+        except Exception as e:
+            logger.error(f"Browser session failed for {len(bill_ids)} bills: {str(e)}")
+            return (
+                {bill_id: [] for bill_id in bill_ids},
+                [{'bill_id': bill_id, 'error': str(e), 'files_downloaded': 0} for bill_id in bill_ids]
+            )
+
     def _login_to_netsuite(self, page: Page) -> bool:
         """
         Handle NetSuite login via Okta
@@ -587,8 +729,6 @@ def quick_download_test(bill_id: str, headless: bool = False):
 
     print(f"\n{'='*60}")
     print(f"Downloaded {len(files)} files:")
-    for file_path in files:
-        print(f"  - {file_path}")
-    print(f"{'='*60}\n")
+    sys.stdout.write("".join(f"  - {file_path}\n" for file_path in files) + f"{'='*60}\n\n")
 
     return files
@@ -3,9 +3,17 @@ Snowflake Data Client - Fetches PO/Bill data from Snowflake views
 Replaces NetSuite API calls with Snowflake queries
 """
 
-from typing import List, Dict, Optional
+import atexit
+import csv
+import gzip
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import FrozenSet, Iterable, List, Dict, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime
+from pathlib import Path
 import snowflake.connector
 from snowflake.connector import DictCursor
 
@@ -14,6 +22,73 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# (bill_id, file_name) pairs per IN (...) list when looking up processed invoices
+PROCESSED_LOOKUP_BATCH_SIZE = 1000
+
+# Result CSVs are loaded with PUT (to the user stage) + COPY INTO, one statement per file
+UPLOAD_STAGE = "@~/accruals_automation"
+UPLOAD_PUT_PARALLEL = 8
+# COPY loads staged files in parallel, so large CSVs are split into gzipped parts first
+# (~64 MB of CSV compresses to roughly the 10-20 MB per file Snowflake recommends)
+UPLOAD_SPLIT_THRESHOLD_BYTES = 128 * 1024 * 1024
+UPLOAD_PART_BYTES = 64 * 1024 * 1024
+UPLOAD_FILE_FORMAT = """
+    TYPE = CSV
+    SKIP_HEADER = 1
+    FIELD_OPTIONALLY_ENCLOSED_BY = '"'
+    EMPTY_FIELD_AS_NULL = TRUE
+    SKIP_BLANK_LINES = TRUE
+    ENCODING = 'UTF8'
+"""
+
+EXTRACTED_INVOICES_TABLE = "PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_EXTRACTED_INVOICES"
+ANALYSIS_RESULTS_TABLE = "PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_ANALYSIS_RESULTS"
+
+
+def _read_csv_header(csv_path: Path) -> List[str]:
+    """Return the header row of a CSV file (empty list for an empty file)"""
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def _split_csv_gz(csv_path: Path, out_dir: Path, part_bytes: int = UPLOAD_PART_BYTES) -> int:
+    """
+    Split a CSV into gzipped parts of about part_bytes each, repeating the header in every part
+
+    Splits on parsed rows (not lines), so quoted fields containing line breaks stay intact.
+
+    Returns:
+        Number of parts written (out_dir/part-0001.csv.gz, part-0002.csv.gz, ...)
+    """
+    parts = 0
+    part_file = None
+    try:
+        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0
+
+            written = part_bytes  # Start a part on the first row
+            for row in reader:
+                if written >= part_bytes:
+                    if part_file is not None:
+                        part_file.close()
+                    parts += 1
+                    # Level 1: compression stays well below upload time, ratio is close to the default
+                    part_file = gzip.open(out_dir / f"part-{parts:04d}.csv.gz", 'wt', compresslevel=1,
+                                          newline='', encoding='utf-8')
+                    writer = csv.writer(part_file)
+                    writer.writerow(header)
+                    written = 0
+                writer.writerow(row)
+                written += sum(map(len, row)) + len(row)
+    finally:
+        if part_file is not None:
+            part_file.close()
+
+    return parts
+
 
 @dataclass
 class POLine:
@@ -75,11 +150,54 @@ class SnowflakeDataClient:
         if SnowflakeConfig.ROLE:
             self.connection_params['role'] = SnowflakeConfig.ROLE
 
+        # Heartbeats keep the session from idling out between queries on long runs
+        self.connection_params['client_session_keep_alive'] = True
+
+        self._connection = None
+        self._connection_lock = threading.RLock()  # Re-entrant: held for each whole _get_connection block
+
         logger.info("Snowflake data client initialized")
 
+    @contextmanager
     def _get_connection(self):
-        """Get a Snowflake connection"""
-        return snowflake.connector.connect(**self.connection_params)
+        """
+        Use the client's Snowflake connection, opening (or reopening) it on first use
+
+        The connection is kept open across calls so the login handshake happens once
+        per run instead of once per query; call close() to release it. Like the
+        connector's own context manager, the block commits on success and rolls back
+        on error.
+
+        The lock is held for the whole block, so threads sharing the client run their
+        queries one at a time and never commit or roll back each other's work.
+        """
+        with self._connection_lock:
+            if self._connection is None or self._connection.is_closed():
+                self._connection = snowflake.connector.connect(**self.connection_params)
+                logger.info("Opened Snowflake connection")
+            conn = self._connection
+
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception as e:
+                    # Don't let a failed rollback on a broken connection hide the original error
+                    logger.debug(f"Error rolling back Snowflake transaction: {str(e)}")
+                raise
+
+    def close(self):
+        """Close the Snowflake connection (the next query opens a new one)"""
+        with self._connection_lock:
+            conn, self._connection = self._connection, None
+
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.debug(f"Error closing Snowflake connection: {str(e)}")
 
     def get_po_line_details(self, po_id: str, line_id: str) -> Optional[POLine]:
         """
@@ -93,8 +211,7 @@ class SnowflakeDataClient:
             POLine object or None if not found
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor(DictCursor)
+            with self._get_connection() as conn, conn.cursor(DictCursor) as cursor:
 
                 # TODO: Update with your actual Snowflake view name and column mappings
                 query = """
@@ -160,8 +277,7 @@ class SnowflakeDataClient:
             List of Bill objects
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor(DictCursor)
+            with self._get_connection() as conn, conn.cursor(DictCursor) as cursor:
 
                 # TODO: Update with your actual Snowflake view name and column mappings
                 query = """
@@ -215,16 +331,15 @@ class SnowflakeDataClient:
         """
         po_lines = {}
 
-        logger.info(f"Fetching {len(po_pr_data)} PO lines from Snowflake")
+        # Duplicate PO/line pairs in the input are fetched once (dict keeps first-seen order)
+        pairs = dict.fromkeys((item.get('po_id'), item.get('line_id')) for item in po_pr_data)
 
-        for item in po_pr_data:
-            po_id = item.get('po_id')
-            line_id = item.get('line_id')
-            po_key = f"{po_id}:{line_id}"
+        logger.info(f"Fetching {len(pairs)} PO lines from Snowflake ({len(po_pr_data)} requested)")
 
+        for po_id, line_id in pairs:
             po_line = self.get_po_line_details(po_id, line_id)
             if po_line:
-                po_lines[po_key] = po_line
+                po_lines[f"{po_id}:{line_id}"] = po_line
 
         logger.info(f"Successfully fetched {len(po_lines)} PO lines from Snowflake")
         return po_lines
@@ -263,8 +378,7 @@ class SnowflakeDataClient:
             List of Bill objects
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor(DictCursor)
+            with self._get_connection() as conn, conn.cursor(DictCursor) as cursor:
 
                 # TODO: Update with your actual Snowflake view name
                 query = """
@@ -316,8 +430,7 @@ class SnowflakeDataClient:
             True if connection successful, False otherwise
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
+            with self._get_connection() as conn, conn.cursor() as cursor:
                 cursor.execute("SELECT CURRENT_VERSION()")
                 version = cursor.fetchone()[0]
                 logger.info(f"Snowflake connection successful. Version: {version}")
@@ -336,8 +449,7 @@ class SnowflakeDataClient:
             List of bill IDs (strings)
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
+            with self._get_connection() as conn, conn.cursor() as cursor:
 
                 query = """
                     SELECT DISTINCT BILL_TRANSACTION_ID
@@ -358,35 +470,19 @@ class SnowflakeDataClient:
             logger.error(f"Error fetching bills to download from Snowflake: {str(e)}")
             return []
 
-    def get_processed_invoices(self) -> set:
+    def get_processed_invoices(self) -> FrozenSet[Tuple[str, str]]:
         """
         Get all (bill_id, file_name) pairs that have already been processed
         from Snowflake table ACCRUALS_AUTOMATION_EXTRACTED_INVOICES
 
         Returns:
-            Set of tuples (bill_id, file_name) representing processed invoices
+            Frozenset of (bill_id, file_name) tuples representing processed invoices
+            (bill IDs are interned - intern the probe's bill_id too for identity-fast lookups)
         """
         try:
             logger.info("Connecting to Snowflake to fetch processed invoices...")
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
+            with self._get_connection() as conn, conn.cursor() as cursor:
 
-                # First check if table has any data
-                count_query = """
-                    SELECT COUNT(*)
-                    FROM PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_EXTRACTED_INVOICES
-                """
-
-                logger.info("Checking table record count...")
-                cursor.execute(count_query)
-                count = cursor.fetchone()[0]
-                logger.info(f"Table has {count} records")
-
-                if count == 0:
-                    logger.info("Table is empty, no processed invoices to load")
-                    return set()
-
-                # If table has data, fetch distinct bill_id and file_name pairs
                 query = """
                     SELECT bill_id, file_name
                     FROM PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_EXTRACTED_INVOICES
@@ -394,18 +490,121 @@ class SnowflakeDataClient:
 
                 logger.info("Executing query to get processed invoices...")
                 cursor.execute(query)
-
-                logger.info("Fetching results...")
-                rows = cursor.fetchall()
-
-                processed_invoices = {(str(row[0]), str(row[1])) for row in rows}
+                processed_invoices = frozenset((sys.intern(str(row[0])), str(row[1])) for row in cursor.fetchall())
 
                 logger.info(f"Loaded {len(processed_invoices)} processed invoices from Snowflake")
                 return processed_invoices
 
         except Exception as e:
             logger.error(f"Error fetching processed invoices from Snowflake: {str(e)}")
-            return set()
+            return frozenset()
+
+    def get_processed_invoices_for(self, keys: Iterable[Tuple[str, str]]) -> FrozenSet[Tuple[str, str]]:
+        """
+        Get which of the given (bill_id, file_name) pairs have already been processed
+
+        Only the pairs found by the local scan are sent, so a run over a few bills reads
+        a few rows instead of the whole ACCRUALS_AUTOMATION_EXTRACTED_INVOICES history.
+
+        Args:
+            keys: (bill_id, file_name) pairs to check (one query per
+                  PROCESSED_LOOKUP_BATCH_SIZE pairs)
+
+        Returns:
+            Frozenset of the (bill_id, file_name) pairs that exist in Snowflake
+            (bill IDs are interned, as in get_processed_invoices)
+        """
+        keys = sorted({(str(bill_id), str(file_name)) for bill_id, file_name in keys})
+        if not keys:
+            return frozenset()
+
+        try:
+            logger.info(f"Checking {len(keys)} invoice files against Snowflake...")
+            with self._get_connection() as conn, conn.cursor() as cursor:
+
+                processed_invoices = set()
+                for start in range(0, len(keys), PROCESSED_LOOKUP_BATCH_SIZE):
+                    batch = keys[start:start + PROCESSED_LOOKUP_BATCH_SIZE]
+                    placeholders = ', '.join(['(%s, %s)'] * len(batch))
+                    cursor.execute(f"""
+                        SELECT bill_id, file_name
+                        FROM PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_EXTRACTED_INVOICES
+                        WHERE (bill_id, file_name) IN ({placeholders})
+                    """, [value for key in batch for value in key])
+                    processed_invoices.update((sys.intern(str(row[0])), str(row[1])) for row in cursor.fetchall())
+
+                logger.info(f"Found {len(processed_invoices)} of {len(keys)} invoice files already in Snowflake")
+                return frozenset(processed_invoices)
+
+        except Exception as e:
+            logger.error(f"Error fetching processed invoices from Snowflake: {str(e)}")
+            return frozenset()
+
+    def _stage_and_copy(self, csv_file_path: str, table: str, columns: Tuple[str, ...], select_list: str) -> int:
+        """
+        Load a results CSV into a table with PUT + COPY INTO
+
+        The file is gzip-compressed and uploaded once, then loaded in a single COPY
+        statement (all rows or none) instead of one INSERT round trip per row. CSVs over
+        UPLOAD_SPLIT_THRESHOLD_BYTES are split into gzipped parts first, so the PUT and the
+        COPY both work on several files in parallel.
+
+        COPY reads the staged columns by position, so the CSV header must match columns
+        exactly - a reordered, missing or extra column aborts before anything is staged.
+
+        Args:
+            csv_file_path: Local CSV file (header row first, columns in the order select_list expects)
+            table: Fully qualified target table
+            columns: Target column names, which are also the expected CSV header
+            select_list: COPY transformation over the staged columns ($1, $2, ...)
+
+        Returns:
+            Number of rows loaded
+
+        Raises:
+            ValueError: If the CSV header does not match columns
+        """
+        csv_path = Path(csv_file_path).resolve()
+
+        header = _read_csv_header(csv_path)
+        if header != list(columns):
+            raise ValueError(f"{csv_path.name} header {header} does not match the expected columns {list(columns)}")
+        # Unique stage path per upload, so an identical re-upload is appended like before
+        stage_path = f"{UPLOAD_STAGE}/{table.rsplit('.', 1)[-1]}/{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+        with tempfile.TemporaryDirectory(prefix="snowflake_upload_") as temp_dir, \
+                self._get_connection() as conn, conn.cursor() as cursor:
+
+            parts = 0
+            if csv_path.stat().st_size > UPLOAD_SPLIT_THRESHOLD_BYTES:
+                parts = _split_csv_gz(csv_path, Path(temp_dir))
+                logger.info(f"Split {csv_path.name} into {parts} gzipped parts")
+
+            if parts:
+                local_path = f"{Path(temp_dir).as_posix()}/part-*.csv.gz"
+                compression = "AUTO_COMPRESS = FALSE SOURCE_COMPRESSION = GZIP"
+            else:
+                local_path = csv_path.as_posix()
+                compression = "AUTO_COMPRESS = TRUE"
+            local_path = local_path.replace("'", "\\'")
+
+            logger.info(f"Staging {csv_path.name} to {stage_path}")
+            cursor.execute(
+                f"PUT 'file://{local_path}' {stage_path} "
+                f"{compression} PARALLEL = {UPLOAD_PUT_PARALLEL} OVERWRITE = TRUE"
+            )
+
+            logger.info(f"Copying {csv_path.name} into {table}")
+            cursor.execute(f"""
+                COPY INTO {table} ({', '.join(columns)})
+                FROM (SELECT {select_list} FROM {stage_path})
+                FILE_FORMAT = ({UPLOAD_FILE_FORMAT})
+                ON_ERROR = ABORT_STATEMENT
+                PURGE = TRUE
+            """)
+
+            # One result row per loaded file: (file, status, rows_parsed, rows_loaded, ...)
+            return sum(int(row[3] or 0) for row in cursor.fetchall() if len(row) > 3)
 
     def upload_csv_to_snowflake(self, csv_file_path: str) -> bool:
         """
@@ -414,70 +613,29 @@ class SnowflakeDataClient:
 
         Args:
             csv_file_path: Path to CSV file with NEW invoice extraction results
+                           (columns in run_invoice_extraction.CSV_FIELDNAMES order)
 
         Returns:
             True if upload successful, False otherwise
         """
         try:
-            import csv as csv_module
-
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Read CSV and insert rows directly
-                logger.info(f"Reading CSV file: {csv_file_path}")
-
-                with open(csv_file_path, 'r', encoding='utf-8-sig') as csvfile:
-                    reader = csv_module.DictReader(csvfile)
-                    rows = list(reader)
-
-                if not rows:
-                    logger.info("No rows to upload (CSV is empty)")
-                    return True
-
-                # Debug: print first row keys to verify column names
-                logger.info(f"CSV columns: {list(rows[0].keys())}")
-                logger.info(f"Inserting {len(rows)} rows into ACCRUALS_AUTOMATION_EXTRACTED_INVOICES table")
-
-                # Prepare insert query
-                insert_query = """
-                    INSERT INTO PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_EXTRACTED_INVOICES
-                    (bill_id, file_name, is_invoice, invoice_number, invoice_date,
-                     service_description, service_period, line_items_summary,
-                     total_amount, tax_amount, net_amount, currency, confidence_score,
-                     processing_time_seconds, file_path)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-
-                # Insert each row
-                for row in rows:
-                    # Strip leading single quote from service_period if present (Excel text formatting)
-                    service_period = row['service_period'] if row['service_period'] else None
-                    if service_period and service_period.startswith("'"):
-                        service_period = service_period[1:]
-
-                    cursor.execute(insert_query, (
-                        row['bill_id'],
-                        row['file_name'],
-                        row['is_invoice'].lower() == 'true',  # Convert to boolean
-                        row['invoice_number'] if row['invoice_number'] else None,
-                        row['invoice_date'] if row['invoice_date'] else None,
-                        row['service_description'] if row['service_description'] else None,
-                        service_period,
-                        row['line_items_summary'] if row['line_items_summary'] else None,
-                        float(row['total_amount']) if row['total_amount'] else None,
-                        float(row['tax_amount']) if row['tax_amount'] else None,
-                        float(row['net_amount']) if row['net_amount'] else None,
-                        row['currency'] if row['currency'] else None,
-                        float(row['confidence_score']) if row['confidence_score'] else None,
-                        float(row['processing_time_seconds']) if row['processing_time_seconds'] else None,
-                        row['file_path'] if row['file_path'] else None
-                    ))
-
-                conn.commit()
-
-                logger.info(f"Successfully inserted {len(rows)} rows into Snowflake")
-                return True
+            rows_loaded = self._stage_and_copy(
+                csv_file_path,
+                EXTRACTED_INVOICES_TABLE,
+                columns=('bill_id', 'file_name', 'is_invoice', 'invoice_number', 'invoice_date',
+                         'service_description', 'service_period', 'line_items_summary',
+                         'total_amount', 'tax_amount', 'net_amount', 'currency', 'confidence_score',
+                         'processing_time_seconds', 'file_path'),
+                # is_invoice: only 'True' is true (FAILED/ERROR rows load as false);
+                # service_period: strip the leading quote added for Excel text formatting
+                select_list="""$1, $2, COALESCE(LOWER($3) = 'true', FALSE), $4, $5,
+                    $6, REGEXP_REPLACE($7, '^\\'', ''), $8,
+                    $9, $10, $11, $12, $13,
+                    $14, $15"""
+            )
+
+            logger.info(f"Successfully inserted {rows_loaded} rows into Snowflake")
+            return True
 
         except Exception as e:
             logger.error(f"Error uploading CSV to Snowflake: {str(e)}")
@@ -490,71 +648,28 @@ class SnowflakeDataClient:
 
         Args:
             csv_file_path: Path to CSV file with accrual analysis results
+                           (columns in run_accrual_analysis fieldnames order)
 
         Returns:
             True if upload successful, False otherwise
         """
         try:
-            import csv as csv_module
-
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Read CSV and insert rows directly
-                logger.info(f"Reading CSV file: {csv_file_path}")
-
-                with open(csv_file_path, 'r', encoding='utf-8-sig') as csvfile:
-                    reader = csv_module.DictReader(csvfile)
-                    rows = list(reader)
-
-                if not rows:
-                    logger.info("No rows to upload (CSV is empty)")
-                    return True
-
-                # Debug: print first row keys to verify column names
-                logger.info(f"CSV columns: {list(rows[0].keys())}")
-                logger.info(f"Inserting {len(rows)} rows into ACCRUALS_AUTOMATION_ANALYSIS_RESULTS table")
-
-                # Prepare insert query
-                insert_query = """
-                    INSERT INTO PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_ANALYSIS_RESULTS
-                    (lookup_key, po_number, vendor_name, gl_account, description,
-                     total_amount, billed_amount, unbilled_amount, currency,
-                     needs_accrual, accrual_amount, short_summary, reasoning, confidence_score,
-                     analysis_month, analyzed_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-
-                # Insert each row
-                for row in rows:
-                    # Strip leading single quote from analysis_month if present (Excel text formatting)
-                    analysis_month = row['analysis_month'] if row['analysis_month'] else None
-                    if analysis_month and analysis_month.startswith("'"):
-                        analysis_month = analysis_month[1:]
-
-                    cursor.execute(insert_query, (
-                        row['lookup_key'] if row['lookup_key'] else None,
-                        row['po_number'] if row['po_number'] else None,
-                        row['vendor_name'] if row['vendor_name'] else None,
-                        row['gl_account'] if row['gl_account'] else None,
-                        row['description'] if row['description'] else None,
-                        float(row['total_amount']) if row['total_amount'] else None,
-                        float(row['billed_amount']) if row['billed_amount'] else None,
-                        float(row['unbilled_amount']) if row['unbilled_amount'] else None,
-                        row['currency'] if row['currency'] else None,
-                        row['needs_accrual'].lower() == 'true',  # Convert to boolean
-                        float(row['accrual_amount']) if row['accrual_amount'] else None,
-                        row['short_summary'] if row['short_summary'] else None,
-                        row['reasoning'] if row['reasoning'] else None,
-                        float(row['confidence_score']) if row['confidence_score'] else None,
-                        analysis_month,
-                        row['analyzed_at'] if row['analyzed_at'] else None
-                    ))
-
-                conn.commit()
-
-                logger.info(f"Successfully inserted {len(rows)} rows into Snowflake")
-                return True
+            rows_loaded = self._stage_and_copy(
+                csv_file_path,
+                ANALYSIS_RESULTS_TABLE,
+                columns=('lookup_key', 'po_number', 'vendor_name', 'gl_account', 'description',
+                         'total_amount', 'billed_amount', 'unbilled_amount', 'currency',
+                         'needs_accrual', 'accrual_amount', 'short_summary', 'reasoning', 'confidence_score',
+                         'analysis_month', 'analyzed_at'),
+                # analysis_month: strip the leading quote added for Excel text formatting
+                select_list="""$1, $2, $3, $4, $5,
+                    $6, $7, $8, $9,
+                    COALESCE(LOWER($10) = 'true', FALSE), $11, $12, $13, $14,
+                    REGEXP_REPLACE($15, '^\\'', ''), $16"""
+            )
+
+            logger.info(f"Successfully inserted {rows_loaded} rows into Snowflake")
+            return True
 
         except Exception as e:
             logger.error(f"Error uploading accrual analysis CSV to Snowflake: {str(e)}")
@@ -569,8 +684,7 @@ class SnowflakeDataClient:
             List of dicts with PO line data
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor(DictCursor)
+            with self._get_connection() as conn, conn.cursor(DictCursor) as cursor:
 
                 query = """
                     SELECT
@@ -614,8 +728,7 @@ class SnowflakeDataClient:
             Dict mapping PO_NUMBER to list of bill line items
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor(DictCursor)
+            with self._get_connection() as conn, conn.cursor(DictCursor) as cursor:
 
                 query = """
                     SELECT
@@ -675,8 +788,7 @@ class SnowflakeDataClient:
             Set of LOOKUP_KEYs that have already been analyzed
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
+            with self._get_connection() as conn, conn.cursor() as cursor:
 
                 query = """
                     SELECT DISTINCT LOOKUP_KEY
@@ -696,3 +808,19 @@ class SnowflakeDataClient:
         except Exception as e:
             logger.error(f"Error fetching analyzed PO lines for month {analysis_month}: {str(e)}")
             return set()
+
+
+# Global instance
+_snowflake_client = None
+_snowflake_client_lock = threading.Lock()
+
+
+def get_snowflake_client() -> SnowflakeDataClient:
+    """Get the shared Snowflake client (one connection for the whole process)"""
+    global _snowflake_client
+    if _snowflake_client is None:
+        with _snowflake_client_lock:
+            if _snowflake_client is None:
+                _snowflake_client = SnowflakeDataClient()
+                atexit.register(_snowflake_client.close)
+    return _snowflake_client
@@ -2,21 +2,70 @@
 Accrual Decision Engine - Uses AI to analyze if accruals are needed for PO lines
 """
 
-import json
+import asyncio
+import functools
+import sys
+import tempfile
+import time
+import orjson
 import yaml
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional, Tuple, Union
 from dataclasses import dataclass
-from datetime import datetime, date
+from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
-from openai import OpenAI
-
-from config.settings import OpenAIConfig
+from openai import AsyncOpenAI
+from openai.types import CompletionUsage
+
+from config.settings import OpenAIConfig, AppConfig, CACHE_DIR
+from src.processors.decision_cache import DecisionCache, make_cache_key
+from src.processors.openai_client import (get_sync_client, get_async_client, close_async_clients, openai_retry,
+                                         run_chat_completions_batch, batch_response_body)
+from src.processors.rate_limiter import get_rate_limiter, estimate_tokens
 from src.utils.logger import setup_logger
+from src.utils.prompt_manager import compile_template, render_template
 
 logger = setup_logger(__name__)
 
+# __slots__ instances (no per-instance __dict__) where supported - results are held in large lists
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Upper bound on serialized PO line data per multi-PO call, to stay well inside the context window
+MAX_GROUP_DATA_CHARS = 60_000
+
+# Use the libyaml C parser when available
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config(yaml_path: str, mtime: float) -> Dict:
+    """
+    Parse a prompt YAML file; cached per (path, mtime) so edits on disk are picked up
+
+    Callers must treat the returned dict as read-only since it is shared.
+    """
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
 
-@dataclass
+def _json_default(val):
+    """orjson fallback for types it does not serialize natively (Snowflake NUMBER columns arrive as Decimal)"""
+    if isinstance(val, Decimal):
+        return float(val)
+    raise TypeError(f"Type is not JSON serializable: {type(val).__name__}")
+
+
+def _dumps_analysis_data(data: Dict, indent: bool = False) -> str:
+    """
+    Serialize analysis data for a prompt; orjson writes datetime/date as ISO 8601 natively
+
+    Compact by default - indentation is whitespace the model does not need but is billed for.
+    """
+    option = orjson.OPT_INDENT_2 if indent else 0
+    return orjson.dumps(data, default=_json_default, option=option).decode('utf-8')
+
+
+@dataclass(**_SLOTS)
 class AccrualDecision:
     """Result of accrual analysis for a PO line"""
     po_number: str
@@ -42,18 +91,26 @@ class AccrualEngine:
     so all data received here is already filtered and ready for AI analysis.
     """
 
-    def __init__(self, current_month: str = None):
+    def __init__(self, current_month: str = None, cache=None):
         """
         Initialize the accrual engine
 
         Args:
             current_month: The month we're analyzing for (e.g., "February 2025")
                           If not provided, uses current month
+            cache: Optional decision cache (any object with get(key)/set(key, dict)).
+                   Defaults to a SQLite cache in CACHE_DIR when DECISION_CACHE_ENABLED
         """
         if not OpenAIConfig.API_KEY:
             raise ValueError("OpenAI API key not configured")
 
-        self.client = OpenAI(api_key=OpenAIConfig.API_KEY)
+        # Shared pooled client (one per API key) so connections are reused across engines
+        self.client = get_sync_client(OpenAIConfig.API_KEY)
+
+        if cache is None and AppConfig.DECISION_CACHE_ENABLED:
+            cache = DecisionCache(CACHE_DIR / "accrual_decisions.sqlite")
+        self.cache = cache
+        self.cache_hits = 0  # Decisions answered from the cache instead of the API
 
         # Load prompt configuration from YAML
         self._load_prompt_config()
@@ -66,6 +123,15 @@ class AccrualEngine:
 
         logger.info(f"Accrual engine initialized for month: {self.current_month}")
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Shared AsyncOpenAI client (re-created after aclose() for a new event loop)"""
+        return get_async_client(OpenAIConfig.API_KEY)
+
+    async def aclose(self):
+        """Close the async HTTP session - call before the event loop that used it shuts down"""
+        await close_async_clients()
+
     def _load_prompt_config(self):
         """Load prompt configuration from YAML file"""
         yaml_path = Path(__file__).parent.parent.parent / "prompts" / "accrual_analysis.yaml"
@@ -73,8 +139,8 @@ class AccrualEngine:
         if not yaml_path.exists():
             raise FileNotFoundError(f"Prompt config not found: {yaml_path}")
 
-        with open(yaml_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        # Parsed once per file version and shared by all engine instances
+        config = _load_config(str(yaml_path), yaml_path.stat().st_mtime)
 
         self.system_prompt = config['system_prompt']
         self.user_prompt_template = config['user_prompt_template']
@@ -82,7 +148,21 @@ class AccrualEngine:
         self.temperature = config.get('temperature')  # None if not specified
         self.response_format = config.get('response_format')  # None if not specified
 
-        logger.info(f"Loaded prompt config from {yaml_path.name}, model: {self.model}")
+        # Multi-PO prompt used by analyze_po_group_async (None if not configured)
+        self.multi_user_prompt_template = config.get('multi_user_prompt_template')
+        self.multi_response_format = config.get('multi_response_format')
+
+        # Templates are parsed once here instead of on every .format() call
+        self._user_prompt_parts = compile_template(self.user_prompt_template)
+        self._multi_user_prompt_parts = (compile_template(self.multi_user_prompt_template)
+                                         if self.multi_user_prompt_template else None)
+
+        # Optional cheaper model for "simple" PO lines; escalates to self.model on low confidence
+        self.routing_model = config.get('routing_model')  # None disables routing
+        self.routing_min_confidence = float(config.get('routing_min_confidence', 0.7))
+
+        logger.info(f"Loaded prompt config from {yaml_path.name}, model: {self.model}, "
+                    f"routing model: {self.routing_model or 'disabled'}")
 
     def analyze_po_line(self, po_line: Dict, related_bills: List[Dict]) -> AccrualDecision:
         """
@@ -95,8 +175,6 @@ class AccrualEngine:
         Returns:
             AccrualDecision with analysis result
         """
-        import time
-
         po_number = po_line.get('PO_NUMBER')
         logger.info(f"Analyzing PO {po_number} for accrual...")
 
@@ -106,133 +184,588 @@ class AccrualEngine:
             # Prepare data for AI analysis
             analysis_data = self._prepare_data_for_ai(po_line, related_bills)
 
-            # Get AI decision
-            ai_response = self._get_ai_decision(analysis_data)
-
-            processing_time = time.time() - start_time
-
-            # Parse and return decision
-            decision = AccrualDecision(
-                po_number=po_number,
-                needs_accrual=ai_response.get('needs_accrual', False),
-                accrual_amount=float(ai_response.get('accrual_amount', 0)),
-                reasoning=ai_response.get('reasoning', ''),
-                short_summary=ai_response.get('short_summary', ''),
-                confidence_score=float(ai_response.get('confidence', 0)),
-                analyzed_at=datetime.now(),
-                processing_time_seconds=processing_time,
-                tokens_input=ai_response.get('tokens_input', 0),
-                tokens_output=ai_response.get('tokens_output', 0),
-                tokens_total=ai_response.get('tokens_total', 0)
-            )
+            # Route simple lines to the cheaper model first, escalate if it is not confident
+            if self._use_routing_model(po_line, related_bills):
+                cheap_response = self._get_ai_decision(analysis_data, model=self.routing_model)
+                if self._needs_escalation(po_number, cheap_response):
+                    ai_response = self._merge_token_usage(self._get_ai_decision(analysis_data), cheap_response)
+                else:
+                    ai_response = cheap_response
+            else:
+                ai_response = self._get_ai_decision(analysis_data)
+
+            return self._build_decision(po_number, ai_response, time.time() - start_time)
+
+        except Exception as e:
+            return self._build_error_decision(po_number, e, time.time() - start_time)
 
-            logger.info(f"PO {po_number}: Accrual={'YES' if decision.needs_accrual else 'NO'}, "
-                       f"Amount={decision.accrual_amount}, Confidence={decision.confidence_score:.2f}, "
-                       f"Tokens={decision.tokens_total} (in:{decision.tokens_input}, out:{decision.tokens_output}), "
-                       f"Time={processing_time:.1f}s")
+    async def analyze_po_line_async(self, po_line: Dict, related_bills: List[Dict]) -> AccrualDecision:
+        """
+        Async version of analyze_po_line using the AsyncOpenAI client
 
-            return decision
+        Args:
+            po_line: Dict with PO line data from Snowflake
+            related_bills: List of dicts with related bill and invoice data
+
+        Returns:
+            AccrualDecision with analysis result
+        """
+        po_number = po_line.get('PO_NUMBER')
+        logger.info(f"Analyzing PO {po_number} for accrual...")
+
+        start_time = time.time()
+
+        try:
+            analysis_data = self._prepare_data_for_ai(po_line, related_bills)
+
+            if self._use_routing_model(po_line, related_bills):
+                cheap_response = await self._get_ai_decision_async(analysis_data, model=self.routing_model)
+                if self._needs_escalation(po_number, cheap_response):
+                    ai_response = self._merge_token_usage(
+                        await self._get_ai_decision_async(analysis_data), cheap_response
+                    )
+                else:
+                    ai_response = cheap_response
+            else:
+                ai_response = await self._get_ai_decision_async(analysis_data)
+
+            return self._build_decision(po_number, ai_response, time.time() - start_time)
 
         except Exception as e:
-            processing_time = time.time() - start_time
-            logger.error(f"Error analyzing PO {po_number}: {str(e)}")
-            return AccrualDecision(
-                po_number=po_number,
-                needs_accrual=False,
-                accrual_amount=0.0,
-                reasoning=f"ERROR: {str(e)}",
-                short_summary=f"ERROR: {str(e)}",
-                confidence_score=0.0,
-                analyzed_at=datetime.now(),
-                processing_time_seconds=processing_time,
-                tokens_input=0,
-                tokens_output=0,
-                tokens_total=0
-            )
+            return self._build_error_decision(po_number, e, time.time() - start_time)
 
-    def _prepare_data_for_ai(self, po_line: Dict, related_bills: List[Dict]) -> Dict:
+    def group_po_lines(self, items: List[Tuple[Dict, List[Dict]]], k: int = 5) -> List[List[Tuple[Dict, List[Dict]]]]:
         """
-        Prepare structured data for AI analysis
+        Split PO lines into groups for analyze_po_group_async
+
+        Args:
+            items: List of (po_line, related_bills) tuples
+            k: Maximum number of PO lines per group
+
+        Returns:
+            Groups of at most k lines and MAX_GROUP_DATA_CHARS of serialized data, in input order
+        """
+        groups = []
+        current_group = []
+        current_chars = 0
+        for po_line, related_bills in items:
+            data_chars = len(_dumps_analysis_data(self._prepare_data_for_ai(po_line, related_bills)))
+
+            if current_group and (len(current_group) >= k or current_chars + data_chars > MAX_GROUP_DATA_CHARS):
+                groups.append(current_group)
+                current_group = []
+                current_chars = 0
+
+            current_group.append((po_line, related_bills))
+            current_chars += data_chars
+
+        if current_group:
+            groups.append(current_group)
+
+        return groups
+
+    async def analyze_po_group_async(self, items: List[Tuple[Dict, List[Dict]]]) -> List[AccrualDecision]:
+        """
+        Analyze a group of PO lines with one chat completion per model tier
+
+        Sends the system prompt once per group instead of once per line, cutting requests
+        (usually the binding rate limit) by up to the group size. Lines found in the decision
+        cache are not sent; simple lines go to the routing model first and the ones it is not
+        confident about are re-scored together on the main model.
+
+        Args:
+            items: List of (po_line, related_bills) tuples (see group_po_lines)
+
+        Returns:
+            List of AccrualDecision objects in the same order as items
+        """
+        if not self._multi_user_prompt_parts:
+            raise ValueError("multi_user_prompt_template not configured in accrual_analysis.yaml")
+
+        start_time = time.time()
+        analysis_data = [self._prepare_data_for_ai(po_line, related_bills) for po_line, related_bills in items]
+        responses: List[Union[Dict, Exception, None]] = [None] * len(items)
+        cheap_responses: Dict[int, Dict] = {}
+
+        routed = [i for i, (po_line, related_bills) in enumerate(items) if self._use_routing_model(po_line, related_bills)]
+        routed_set = set(routed)
+        main = [i for i in range(len(items)) if i not in routed_set]
+
+        if routed:
+            results = await self._get_group_decisions_async([analysis_data[i] for i in routed], model=self.routing_model)
+            for i, result in zip(routed, results):
+                if not isinstance(result, Exception) and self._needs_escalation(items[i][0].get('PO_NUMBER'), result):
+                    cheap_responses[i] = result
+                    main.append(i)
+                else:
+                    responses[i] = result
+
+        if main:
+            main.sort()
+            results = await self._get_group_decisions_async([analysis_data[i] for i in main])
+            for i, result in zip(main, results):
+                if i in cheap_responses and not isinstance(result, Exception):
+                    result = self._merge_token_usage(result, cheap_responses[i])
+                responses[i] = result
+
+        # No per-line timing in a shared call - split evenly across the group
+        processing_time = (time.time() - start_time) / len(items)
+
+        decisions = []
+        for (po_line, _), response in zip(items, responses):
+            if isinstance(response, Exception):
+                decisions.append(self._build_error_decision(po_line.get('PO_NUMBER'), response, processing_time))
+            else:
+                decisions.append(self._build_decision(po_line.get('PO_NUMBER'), response, processing_time))
+
+        return decisions
+
+    def submit_batch(self, items: List[Tuple[Dict, List[Dict]]], poll_interval: int = 30) -> List[AccrualDecision]:
+        """
+        Analyze many PO lines through the OpenAI Batch API (50% cheaper, separate rate-limit pool)
+
+        Suited to month-end runs where all PO lines are known up front and results can
+        take up to the 24h completion window. Every line goes to the main model - the
+        routing tier is not used because escalation would need a second batch.
+
+        Args:
+            items: List of (po_line, related_bills) tuples
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            List of AccrualDecision objects in the same order as items
+        """
+        start_time = time.time()
+
+        # One JSONL request per PO line; custom_id maps results back to input order
+        requests = []
+        for i, (po_line, related_bills) in enumerate(items):
+            analysis_data = self._prepare_data_for_ai(po_line, related_bills)
+            requests.append({
+                "custom_id": f"{i}:{po_line.get('PO_NUMBER')}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._build_api_params(analysis_data)
+            })
+
+        # Write to a closed temp file first so it can be reopened for upload on Windows
+        with tempfile.NamedTemporaryFile('wb', suffix='.jsonl', delete=False) as f:
+            for request in requests:
+                f.write(orjson.dumps(request) + b"\n")
+            batch_input_path = Path(f.name)
+
+        try:
+            batch, results_by_id = run_chat_completions_batch(self.client, batch_input_path, len(requests), poll_interval)
+        finally:
+            batch_input_path.unlink()
+
+        # Batch requests have no individual timings - amortize the wall time across lines
+        processing_time = (time.time() - start_time) / max(len(items), 1)
+
+        decisions = []
+        for request, (po_line, _) in zip(requests, items):
+            po_number = po_line.get('PO_NUMBER')
+            try:
+                body = batch_response_body(results_by_id.get(request['custom_id']), batch.status)
+                usage = CompletionUsage(**body['usage']) if body.get('usage') else None
+                ai_response = self._parse_ai_response(body['choices'][0]['message']['content'], usage)
+                decisions.append(self._build_decision(po_number, ai_response, processing_time))
+
+            except Exception as e:
+                decisions.append(self._build_error_decision(po_number, e, processing_time))
+
+        logger.info(f"Batch {batch.id} finished with status {batch.status} in {time.time() - start_time:.0f}s")
+        return decisions
+
+    def _use_routing_model(self, po_line: Dict, related_bills: List[Dict]) -> bool:
+        """Whether this PO line should be tried on the cheaper routing model first"""
+        return bool(self.routing_model) and self._classify_complexity(po_line, related_bills) == "simple"
+
+    def _needs_escalation(self, po_number: str, ai_response: Dict) -> bool:
+        """Whether a routing-model response is not confident enough and must be re-run on the main model"""
+        confidence = float(ai_response.get('confidence', 0))
+        if confidence < self.routing_min_confidence:
+            logger.info(f"PO {po_number}: {self.routing_model} confidence {confidence:.2f} below "
+                        f"{self.routing_min_confidence:.2f}, escalating to {self.model}")
+            return True
+        return False
+
+    def _merge_token_usage(self, ai_response: Dict, cheap_response: Dict) -> Dict:
+        """Add tokens spent on the routing-model attempt to the escalated response"""
+        for key in ('tokens_input', 'tokens_output', 'tokens_total'):
+            ai_response[key] = ai_response.get(key, 0) + cheap_response.get(key, 0)
+        return ai_response
+
+    def _build_decision(self, po_number: str, ai_response: Dict, processing_time: float) -> AccrualDecision:
+        """Convert a parsed AI response into an AccrualDecision"""
+        decision = AccrualDecision(
+            po_number=po_number,
+            needs_accrual=ai_response.get('needs_accrual', False),
+            accrual_amount=float(ai_response.get('accrual_amount', 0)),
+            reasoning=ai_response.get('reasoning', ''),
+            short_summary=ai_response.get('short_summary', ''),
+            confidence_score=float(ai_response.get('confidence', 0)),
+            analyzed_at=datetime.now(),
+            processing_time_seconds=processing_time,
+            tokens_input=ai_response.get('tokens_input', 0),
+            tokens_output=ai_response.get('tokens_output', 0),
+            tokens_total=ai_response.get('tokens_total', 0)
+        )
+
+        logger.info(f"PO {po_number}: Accrual={'YES' if decision.needs_accrual else 'NO'}, "
+                   f"Amount={decision.accrual_amount}, Confidence={decision.confidence_score:.2f}, "
+                   f"Tokens={decision.tokens_total} (in:{decision.tokens_input}, out:{decision.tokens_output}), "
+                   f"Time={processing_time:.1f}s")
+
+        return decision
+
+    def _build_error_decision(self, po_number: str, error: Exception, processing_time: float) -> AccrualDecision:
+        """Build a 'no accrual' decision recording an analysis error"""
+        logger.error(f"Error analyzing PO {po_number}: {str(error)}")
+        return AccrualDecision(
+            po_number=po_number,
+            needs_accrual=False,
+            accrual_amount=0.0,
+            reasoning=f"ERROR: {str(error)}",
+            short_summary=f"ERROR: {str(error)}",
+            confidence_score=0.0,
+            analyzed_at=datetime.now(),
+            processing_time_seconds=processing_time,
+            tokens_input=0,
+            tokens_output=0,
+            tokens_total=0
+        )
+
+    def _classify_complexity(self, po_line: Dict, related_bills: List[Dict]) -> Literal["simple", "complex"]:
+        """
+        Classify a PO line as "simple" (safe for the cheaper routing model) or "complex"
+
+        A line is simple when it has at most one related bill, the billed amount matches
+        the PO total within 1%, and there are no service start dates to reason about.
 
         Args:
             po_line: PO line data
             related_bills: Related bills and invoices
 
         Returns:
-            Dict with formatted data for AI
+            "simple" or "complex"
         """
-        from decimal import Decimal
+        if len(related_bills) > 1 or po_line.get('START_DATE') is not None:
+            return "complex"
+
+        try:
+            total_amount = float(po_line.get('TOTAL_AMOUNT_FOREIGN') or 0)
+            billed_amount = sum(float(bill.get('BILL_AMOUNT_FOREIGN') or 0) for bill in related_bills)
+        except (TypeError, ValueError):
+            return "complex"
 
-        # Convert datetime/date/Decimal objects to strings for JSON serialization
-        def serialize_value(val):
-            if isinstance(val, (datetime, date)):
-                return val.isoformat()
-            elif isinstance(val, Decimal):
-                return float(val)
-            elif val is None:
-                return None
-            return val
+        if total_amount == 0:
+            return "complex"
 
-        po_data = {k: serialize_value(v) for k, v in po_line.items()}
-        bills_data = [{k: serialize_value(v) for k, v in bill.items()} for bill in related_bills]
+        if abs(total_amount - billed_amount) / abs(total_amount) < 0.01:
+            return "simple"
+
+        return "complex"
+
+    def _prepare_data_for_ai(self, po_line: Dict, related_bills: List[Dict]) -> Dict:
+        """
+        Prepare structured data for AI analysis
 
+        Args:
+            po_line: PO line data
+            related_bills: Related bills and invoices
+
+        Returns:
+            Dict with formatted data for AI
+        """
+        # Raw Snowflake values (datetime/date/Decimal) are handled by _dumps_analysis_data when the prompt is built
         return {
             "current_analysis_month": self.current_month,
-            "po_line": po_data,
-            "related_bills": bills_data,
+            "po_line": po_line,
+            "related_bills": related_bills,
             "bill_count": len(related_bills)
         }
 
-    def _get_ai_decision(self, analysis_data: Dict) -> Dict:
+    def _build_api_params(self, analysis_data: Dict, model: Optional[str] = None) -> Dict:
         """
-        Send data to AI for accrual decision
+        Build chat completion parameters for an accrual decision
 
         Args:
             analysis_data: Prepared data dict
+            model: Optional model override (defaults to the model from YAML)
 
         Returns:
-            Dict with AI decision
+            Dict of keyword arguments for chat.completions.create
         """
         # Format user prompt with template variables
-        user_prompt = self.user_prompt_template.format(
-            analysis_data=json.dumps(analysis_data, indent=2),
+        user_prompt = render_template(
+            self._user_prompt_parts,
+            analysis_data=_dumps_analysis_data(analysis_data, indent=AppConfig.PRETTY_PROMPT),
             current_month=self.current_month
         )
 
-        try:
-            # Build API call parameters - only include optional params if specified in YAML
-            api_params = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            }
+        # Build API call parameters - only include optional params if specified in YAML
+        api_params = {
+            "model": model or self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+
+        # Add optional parameters only if they exist
+        if self.response_format:
+            api_params["response_format"] = self.response_format
+
+        if self.temperature is not None:
+            api_params["temperature"] = self.temperature
+
+        return api_params
+
+    def _build_group_api_params(self, analysis_data: List[Dict], model: Optional[str] = None) -> Dict:
+        """
+        Build chat completion parameters scoring several PO lines in one call
+
+        Args:
+            analysis_data: Prepared data dicts, one per PO line
+            model: Optional model override (defaults to the model from YAML)
+
+        Returns:
+            Dict of keyword arguments for chat.completions.create
+        """
+        # line_id (not PO number) identifies each line, since one PO can have several lines
+        lines = []
+        for line_id, data in enumerate(analysis_data, 1):
+            line_data = {k: v for k, v in data.items() if k != 'current_analysis_month'}
+            lines.append({"line_id": str(line_id), **line_data})
+
+        user_prompt = render_template(
+            self._multi_user_prompt_parts,
+            analysis_data=_dumps_analysis_data({"current_analysis_month": self.current_month, "po_lines": lines},
+                                               indent=AppConfig.PRETTY_PROMPT),
+            current_month=self.current_month
+        )
+        api_params = {
+            "model": model or self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+        if self.multi_response_format:
+            api_params["response_format"] = self.multi_response_format
+        if self.temperature is not None:
+            api_params["temperature"] = self.temperature
+
+        return api_params
+
+    def _parse_ai_response(self, content: str, usage) -> Dict:
+        """Parse the JSON decision and attach token usage"""
+        result = orjson.loads(content)
 
-            # Add optional parameters only if they exist
-            if hasattr(self, 'response_format') and self.response_format:
-                api_params["response_format"] = self.response_format
+        result['tokens_input'] = usage.prompt_tokens if usage else 0
+        result['tokens_output'] = usage.completion_tokens if usage else 0
+        result['tokens_total'] = usage.total_tokens if usage else 0
 
-            if hasattr(self, 'temperature') and self.temperature is not None:
-                api_params["temperature"] = self.temperature
+        return result
 
-            response = self.client.chat.completions.create(**api_params)
+    def _cache_key(self, api_params: Dict) -> Optional[str]:
+        """Fingerprint of a decision request, or None when caching is disabled"""
+        if self.cache is None:
+            return None
+        return make_cache_key(api_params)
 
-            # Extract token usage
-            usage = response.usage
-            tokens_input = usage.prompt_tokens if usage else 0
-            tokens_output = usage.completion_tokens if usage else 0
-            tokens_total = usage.total_tokens if usage else 0
+    def _cached_decision(self, cached: Optional[Dict]) -> Optional[Dict]:
+        """Count a cache hit; cache hits report zero tokens since no API call was made"""
+        if cached is None:
+            return None
 
-            result = json.loads(response.choices[0].message.content)
+        self.cache_hits += 1
+        logger.info("Using cached AI decision (identical PO line and bills data)")
+        return {**cached, 'tokens_input': 0, 'tokens_output': 0, 'tokens_total': 0}
+
+    @staticmethod
+    def _cache_entry(result: Dict) -> Dict:
+        """Parsed decision without its per-call token counts"""
+        return {k: v for k, v in result.items() if not k.startswith('tokens_')}
+
+    def _get_ai_decision(self, analysis_data: Dict, model: Optional[str] = None) -> Dict:
+        """
+        Send data to AI for accrual decision
 
-            # Add token info to result
-            result['tokens_input'] = tokens_input
-            result['tokens_output'] = tokens_output
-            result['tokens_total'] = tokens_total
+        Args:
+            analysis_data: Prepared data dict
+            model: Optional model override (defaults to the model from YAML)
 
+        Returns:
+            Dict with AI decision
+        """
+        api_params = self._build_api_params(analysis_data, model)
+        cache_key = self._cache_key(api_params)
+        if cache_key is not None:
+            cached = self._cached_decision(self.cache.get(cache_key))
+            if cached is not None:
+                return cached
+
+        try:
+            content, usage = self._call_openai(api_params)
+            result = self._parse_ai_response(content, usage)
+            if cache_key is not None:
+                self.cache.set(cache_key, self._cache_entry(result))
             return result
 
         except Exception as e:
             logger.error(f"Error getting AI decision: {str(e)}")
             raise
+
+    async def _get_ai_decision_async(self, analysis_data: Dict, model: Optional[str] = None) -> Dict:
+        """
+        Async version of _get_ai_decision (cache reads and writes run in a worker thread)
+
+        Args:
+            analysis_data: Prepared data dict
+            model: Optional model override (defaults to the model from YAML)
+
+        Returns:
+            Dict with AI decision
+        """
+        api_params = self._build_api_params(analysis_data, model)
+        cache_key = self._cache_key(api_params)
+        if cache_key is not None:
+            cached = self._cached_decision(await asyncio.to_thread(self.cache.get, cache_key))
+            if cached is not None:
+                return cached
+
+        try:
+            content, usage = await self._call_openai_async(api_params)
+            result = self._parse_ai_response(content, usage)
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, self._cache_entry(result))
+            return result
+
+        except Exception as e:
+            logger.error(f"Error getting AI decision: {str(e)}")
+            raise
+
+    async def _get_group_decisions_async(self, analysis_data: List[Dict],
+                                         model: Optional[str] = None) -> List[Union[Dict, Exception]]:
+        """
+        Get AI decisions for several PO lines, sending the cache misses in a single call
+
+        Each line is cached on its own, keyed by the request for a group holding just that
+        line, so a line's cached decision does not depend on which lines it was grouped with.
+
+        Args:
+            analysis_data: Prepared data dicts, one per PO line
+            model: Optional model override (defaults to the model from YAML)
+
+        Returns:
+            Parsed decision dict (or the exception that prevented one) per line, in input order
+        """
+        cache_keys = [self._cache_key(self._build_group_api_params([data], model)) for data in analysis_data]
+        results: List[Union[Dict, Exception, None]] = [None] * len(analysis_data)
+        for i, cache_key in enumerate(cache_keys):
+            if cache_key is not None:
+                results[i] = self._cached_decision(await asyncio.to_thread(self.cache.get, cache_key))
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        try:
+            content, usage = await self._call_openai_async(
+                self._build_group_api_params([analysis_data[i] for i in pending], model)
+            )
+            responses_by_id = {str(d.get('line_id')): d for d in orjson.loads(content).get('decisions', [])}
+        except Exception as e:
+            logger.error(f"Error getting AI decisions for group of {len(pending)} PO lines: {str(e)}")
+            for i in pending:
+                results[i] = e
+            return results
+
+        # No per-line token counts in a shared call - split evenly across the lines sent
+        token_share = {
+            'tokens_input': (usage.prompt_tokens if usage else 0) // len(pending),
+            'tokens_output': (usage.completion_tokens if usage else 0) // len(pending),
+            'tokens_total': (usage.total_tokens if usage else 0) // len(pending)
+        }
+
+        for line_id, i in enumerate(pending, 1):
+            response = responses_by_id.get(str(line_id))
+            if response is None:
+                results[i] = RuntimeError(f"No decision returned for line_id {line_id}")
+                continue
+
+            results[i] = {**{k: v for k, v in response.items() if k != 'line_id'}, **token_share}
+            if cache_keys[i] is not None:
+                await asyncio.to_thread(self.cache.set, cache_keys[i], self._cache_entry(results[i]))
+
+        return results
+
+    @openai_retry
+    def _call_openai(self, api_params: Dict) -> tuple:
+        """
+        Stream a chat completion, retrying transient errors with exponential backoff + jitter
+
+        The response is streamed so the body is received incrementally instead of in one
+        blocking read; the stream is consumed inside the retry so a connection reset
+        mid-response is retried as well. Every attempt waits for RPM/TPM capacity first.
+
+        Args:
+            api_params: Keyword arguments for chat.completions.create
+
+        Returns:
+            Tuple of (response_content, usage) - usage is None if not reported
+        """
+        rate_limiter = get_rate_limiter()
+        rate_limiter.acquire(estimate_tokens(api_params))
+
+        raw_response = self.client.chat.completions.with_raw_response.create(
+            **api_params,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        rate_limiter.update_from_headers(raw_response.headers)
+        stream = raw_response.parse()
+
+        chunks = []
+        usage = None
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = chunk.usage
+
+        return "".join(chunks), usage
+
+    @openai_retry
+    async def _call_openai_async(self, api_params: Dict) -> tuple:
+        """
+        Async version of _call_openai
+
+        Args:
+            api_params: Keyword arguments for chat.completions.create
+
+        Returns:
+            Tuple of (response_content, usage) - usage is None if not reported
+        """
+        rate_limiter = get_rate_limiter()
+        await rate_limiter.acquire_async(estimate_tokens(api_params))
+
+        raw_response = await self.async_client.chat.completions.with_raw_response.create(
+            **api_params,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        rate_limiter.update_from_headers(raw_response.headers)
+        stream = raw_response.parse()
+
+        chunks = []
+        usage = None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = chunk.usage
+
+        return "".join(chunks), usage
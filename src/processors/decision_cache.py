@@ -0,0 +1,88 @@
+"""
+Decision Cache - Exact-match cache for AI accrual decisions
+
+Re-runs and retries send identical PO line + bills data to the model. Decisions are
+cached by a SHA-256 fingerprint of the full request (model, rendered prompts, response
+format and temperature), so an unchanged line is answered from disk instead of the API.
+"""
+
+import hashlib
+import orjson
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def make_cache_key(api_params: Dict) -> str:
+    """
+    Fingerprint an accrual decision request
+
+    Hashes the complete chat completion parameters (model, rendered messages,
+    response_format, temperature), so changing any of them never returns
+    decisions made under the old configuration.
+    """
+    payload = orjson.dumps(api_params, default=str, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+class DecisionCache:
+    """SQLite-backed cache of parsed AI decisions; swap in any object with get()/set()"""
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize the cache
+
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS decisions (
+                    cache_key TEXT PRIMARY KEY,
+                    decision_json TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+        logger.info(f"Decision cache initialized: {self.db_path}")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection, commit on success and always close it"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached decision dict for key, or None on a miss"""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT decision_json FROM decisions WHERE cache_key = ?", (key,)).fetchone()
+            return orjson.loads(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"Decision cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, decision: Dict):
+        """Store a decision dict under key"""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO decisions (cache_key, decision_json) VALUES (?, ?)",
+                    (key, orjson.dumps(decision, default=str).decode('utf-8'))
+                )
+        except Exception as e:
+            logger.warning(f"Decision cache write failed: {str(e)}")
@@ -0,0 +1,111 @@
+"""
+Extraction Cache - Content-addressed cache for AI invoice extractions
+
+The same invoice file is often attached to several bills or re-downloaded on later
+runs. Extractions are cached by a SHA-256 of the file bytes (plus the model and prompt
+text), so an identical file is answered from disk instead of being re-sent to the API.
+"""
+
+import hashlib
+import orjson
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's contents, streamed so large files are not read into memory at once"""
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def make_extraction_cache_key(file_hash: str, model_config: Dict, system_prompt: str, user_prompt: str,
+                              extraction_settings: Optional[Dict] = None) -> str:
+    """
+    Fingerprint an invoice extraction request
+
+    Includes the model config (model, temperature, token limit), prompt text and the
+    extraction settings that shape the request (text budget, image rendering), so
+    changing any of them never returns extractions made under the old configuration.
+    """
+    payload = orjson.dumps(
+        {
+            "file_hash": file_hash,
+            "model_config": model_config,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "extraction_settings": extraction_settings or {}
+        },
+        default=str,
+        option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed cache of extracted invoice fields; swap in any object with get()/set()"""
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize the cache
+
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    cache_key TEXT PRIMARY KEY,
+                    extraction_json TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+        logger.info(f"Extraction cache initialized: {self.db_path}")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection, commit on success and always close it"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached extraction dict for key, or None on a miss"""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT extraction_json FROM extractions WHERE cache_key = ?", (key,)).fetchone()
+            return orjson.loads(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, extraction: Dict):
+        """Store an extraction dict under key"""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (cache_key, extraction_json) VALUES (?, ?)",
+                    (key, orjson.dumps(extraction, default=str).decode('utf-8'))
+                )
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed: {str(e)}")
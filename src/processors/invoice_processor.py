@@ -1,22 +1,65 @@
+import asyncio
 import openai
-import base64
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+import binascii
 import mimetypes
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, date
-import json
+import orjson
 import fitz  # PyMuPDF
 from PIL import Image
 import io
-
-from config.settings import OpenAIConfig
+import mmap
+import sys
+import tempfile
+import time
+import threading
+import csv
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import OpenAIConfig, AppConfig, CACHE_DIR
+from src.processors.extraction_cache import ExtractionCache, hash_file, make_extraction_cache_key
+from src.processors.openai_client import (get_sync_client, get_async_client, close_async_clients, openai_retry,
+                                         run_chat_completions_batch, batch_response_body)
+from src.processors.rate_limiter import get_rate_limiter, estimate_tokens
 from src.utils.logger import setup_logger
+from src.utils.token_counter import truncate_to_tokens
 from src.utils.prompt_manager import get_system_prompt, get_user_prompt, get_model_config
 
 logger = setup_logger(__name__)
 
-@dataclass
+# __slots__ instances (no per-instance __dict__) where supported - results are held in large lists
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Rendered page images: at most 1.5x zoom and 1536 px on the longest side. "high" detail is
+# downscaled server-side (fit 2048, shortest side 768), so larger renders only add upload bytes.
+MAX_RENDER_ZOOM = 1.5
+MAX_IMAGE_DIMENSION = 1536
+JPEG_QUALITY = 85
+
+# Token budget for extracted text sent to the model
+MAX_TEXT_TOKENS = 2000
+
+# Stop reading PDF text after this many characters - comfortably more than MAX_TEXT_TOKENS can hold
+MAX_TEXT_CHARS = MAX_TEXT_TOKENS * 8
+
+# Files parsed concurrently (in worker threads) by the async pipeline
+PARSE_WORKERS = 4
+
+# Re-asks (with the parse error as feedback) when a reply is not valid JSON
+MAX_PARSE_RETRIES = 2
+
+# Extracted (text, images) - images are raw bytes or ready-made base64 data URLs
+ExtractedContent = Tuple[str, Optional[List[Union[bytes, str]]]]
+
+# PDFs with more extracted text than this are analyzed from text only (plus any pages without text)
+MIN_TEXT_CHARS_FOR_TEXT_ONLY = 500
+
+@dataclass(**_SLOTS)
 class InvoiceData:
     bill_id: str
     is_invoice: bool  # Whether document is actually an invoice
@@ -34,92 +77,463 @@ class InvoiceData:
     file_path: str
 
 class InvoiceProcessor:
-    def __init__(self):
+    def __init__(self, cache=None, max_workers: int = 8):
+        """
+        Initialize the invoice processor
+
+        Args:
+            cache: Optional extraction cache (any object with get(key)/set(key, dict)).
+                   Defaults to a SQLite cache in CACHE_DIR when EXTRACTION_CACHE_ENABLED
+            max_workers: Size of the thread pool used by process_multiple_invoices
+        """
         if not OpenAIConfig.API_KEY:
             raise ValueError("OpenAI API key not configured")
         
-        # Create OpenAI client the correct way for v1.x
-        from openai import OpenAI
-        self.client = OpenAI(api_key=OpenAIConfig.API_KEY)
+        # Shared pooled client (one per API key); transient errors are retried by _create_completion
+        self.client = get_sync_client(OpenAIConfig.API_KEY)
         self.model = OpenAIConfig.MODEL
         self.max_tokens = OpenAIConfig.MAX_TOKENS
         
+        # Prompts and model config are the same for every invoice - resolve them once
+        self._system_prompt = get_system_prompt("invoice_extraction")
+        self._user_prompt = get_user_prompt("invoice_extraction", content_section='')
+        self._model_config = dict(get_model_config("invoice_extraction"))
+        self._base_params = self._build_base_params(self._model_config)
+        
+        if cache is None and AppConfig.EXTRACTION_CACHE_ENABLED:
+            cache = ExtractionCache(CACHE_DIR / "invoice_extractions.sqlite")
+        self.cache = cache
+        
+        # One pool for the processor's lifetime instead of one per bill (created on first use)
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        
         logger.info("Invoice processor initialized with OpenAI API")
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Shared AsyncOpenAI client (re-created after aclose() for a new event loop)"""
+        return get_async_client(OpenAIConfig.API_KEY)
+
+    async def aclose(self):
+        """Close the async HTTP session - call before the event loop that used it shuts down"""
+        await close_async_clients()
+
+    def close(self):
+        """Shut down the worker pool used by process_multiple_invoices"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the processor's worker pool, creating it on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="invoice")
+            return self._executor
+
     def process_invoice(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
         try:
-            logger.info(f"Processing invoice: {file_path} for bill {bill_id}")
+            cache_key, cached, content = self._prepare_invoice(file_path, bill_id)
+            if cached or content is None:
+                return cached
+            
+            text_content, image_data = content
+            result = self._analyze_with_openai(
+                text_content=text_content,
+                image_data=image_data,
+                file_path=file_path,
+                bill_id=bill_id
+            )
             
-            file_type = self._get_file_type(file_path)
+            if cache_key and result:
+                self.cache.set(cache_key, self._invoice_data_to_cache_dict(result))
             
-            if file_type == 'pdf':
-                return self._process_pdf(file_path, bill_id)
-            elif file_type in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
-                return self._process_image(file_path, bill_id)
-            elif file_type in ['xlsx', 'xls']:
-                return self._process_excel(file_path, bill_id)
-            elif file_type in ['docx', 'doc']:
-                return self._process_word(file_path, bill_id)
-            else:
-                logger.warning(f"Unsupported file type: {file_type} for {file_path}")
-                return None
+            return result
                 
         except Exception as e:
             logger.error(f"Error processing invoice {file_path}: {str(e)}")
             return None
 
+    async def process_invoice_async(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+        """
+        Async version of process_invoice
+
+        Hashing, cache lookups and document parsing are blocking, so they run in a worker
+        thread; only the OpenAI call runs on the event loop.
+        """
+        try:
+            prepared = await asyncio.to_thread(self._prepare_invoice, file_path, bill_id)
+            return await self._finish_invoice_async(prepared, file_path, bill_id)
+                
+        except Exception as e:
+            logger.error(f"Error processing invoice {file_path}: {str(e)}")
+            return None
+
+    async def process_multiple_invoices_async(self, invoice_files: List[str], bill_id: str,
+                                              max_concurrency: int = 8) -> List[InvoiceData]:
+        """
+        Async version of process_multiple_invoices, with at most max_concurrency OpenAI calls in flight
+
+        Args:
+            invoice_files: Paths of the invoice files to process
+            bill_id: Bill the files belong to
+            max_concurrency: Maximum number of concurrent OpenAI calls
+
+        Returns:
+            Successfully extracted InvoiceData objects, in input order
+        """
+        results = [None] * len(invoice_files)
+        invoices = [(file_path, bill_id) for file_path in invoice_files]
+        async for index, result, _ in self.iter_invoice_results(invoices, max_concurrency):
+            results[index] = result
+
+        invoices = [result for result in results if result]
+        logger.info(f"Processed {len(invoices)} invoices successfully for bill {bill_id}")
+        return invoices
+
+    async def iter_processed_invoices(self, invoice_files: List[str], bill_id: str,
+                                      max_concurrency: int = 8) -> AsyncIterator[InvoiceData]:
+        """
+        Process invoice files concurrently, yielding each result as soon as it is ready
+
+        Lets callers start on finished invoices while slower files are still with the model.
+
+        Args:
+            invoice_files: Paths of the invoice files to process
+            bill_id: Bill the files belong to
+            max_concurrency: Maximum number of concurrent OpenAI calls
+
+        Yields:
+            Successfully extracted InvoiceData objects, in completion order
+        """
+        invoices = [(file_path, bill_id) for file_path in invoice_files]
+        async for _, result, _ in self.iter_invoice_results(invoices, max_concurrency):
+            if result:
+                yield result
+
+    async def iter_invoice_results(self, invoices: List[Tuple[str, str]], max_concurrency: int = 8
+                                   ) -> AsyncIterator[Tuple[int, Optional[InvoiceData], float]]:
+        """
+        Producer/consumer pipeline over invoice files
+
+        Producers parse files in worker threads (at most PARSE_WORKERS at a time) into a bounded
+        queue; max_concurrency consumers take parsed files off the queue and call OpenAI. Parsing
+        runs ahead of the network calls instead of waiting for a free request slot.
+
+        Args:
+            invoices: List of (file_path, bill_id) tuples
+            max_concurrency: Maximum number of concurrent OpenAI calls
+
+        Yields:
+            (input index, InvoiceData or None on failure, seconds since parsing started) tuples,
+            in completion order
+        """
+        if not invoices:
+            return
+
+        parse_slots = asyncio.Semaphore(PARSE_WORKERS)
+        parsed = asyncio.Queue(maxsize=max_concurrency)  # Bounds parsed files held in memory
+        finished = asyncio.Queue()
+
+        async def produce(index: int, file_path: str, bill_id: str):
+            # The parse slot is held until the item is queued, so memory stays bounded
+            async with parse_slots:
+                start_time = time.time()
+                try:
+                    prepared = await asyncio.to_thread(self._prepare_invoice, file_path, bill_id)
+                except Exception as e:
+                    logger.error(f"Error processing invoice {file_path}: {str(e)}")
+                    prepared = (None, None, None)
+                await parsed.put((index, file_path, bill_id, prepared, start_time))
+
+        async def consume():
+            while True:
+                index, file_path, bill_id, prepared, start_time = await parsed.get()
+                try:
+                    result = await self._finish_invoice_async(prepared, file_path, bill_id)
+                except Exception as e:
+                    logger.error(f"Error processing invoice {file_path}: {str(e)}")
+                    result = None
+                await finished.put((index, result, time.time() - start_time))
+
+        tasks = [asyncio.create_task(produce(i, file_path, bill_id)) for i, (file_path, bill_id) in enumerate(invoices)]
+        tasks += [asyncio.create_task(consume()) for _ in range(min(max_concurrency, len(invoices)))]
+        try:
+            for _ in invoices:
+                yield await finished.get()
+        finally:
+            # Consumers loop forever, and a caller that stops early leaves producers pending;
+            # wait for the cancellations so no task outlives the pipeline
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit_batch(self, invoices: List[Tuple[str, str]], poll_interval: int = 30) -> List[Optional[InvoiceData]]:
+        """
+        Extract many invoices through the OpenAI Batch API (50% cheaper, separate rate-limit pool)
+
+        Suited to full runs over all bill folders where results can take up to the 24h
+        completion window. Cached extractions are answered locally and never submitted.
+        Replies that fail to parse are not retried, since that would need a second batch.
+        Page images are inlined as base64, so the JSONL must stay under OpenAI's 200 MB
+        batch input limit.
+
+        Args:
+            invoices: List of (file_path, bill_id) tuples
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            InvoiceData (None on failure) for each input, in the same order
+        """
+        results: List[Optional[InvoiceData]] = [None] * len(invoices)
+        cache_keys: Dict[str, Optional[str]] = {}
+
+        # Parse documents on the worker pool; requests are streamed to disk as they come back (in input order)
+        prepared = self._get_executor().map(lambda invoice: self._prepare_invoice_safely(*invoice), invoices)
+        
+        # Write to a closed temp file first so it can be reopened for upload on Windows
+        with tempfile.NamedTemporaryFile('wb', suffix='.jsonl', delete=False) as f:
+            for index, (cache_key, cached, content) in enumerate(prepared):
+                if cached or content is None:
+                    results[index] = cached
+                    continue
+                
+                text_content, image_data = content
+                custom_id = str(index)
+                f.write(orjson.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._build_api_params(text_content, image_data)
+                }) + b"\n")
+                cache_keys[custom_id] = cache_key
+            batch_input_path = Path(f.name)
+
+        try:
+            if not cache_keys:
+                return results
+            batch, results_by_id = run_chat_completions_batch(self.client, batch_input_path, len(cache_keys), poll_interval)
+        finally:
+            batch_input_path.unlink()
+
+        for custom_id, cache_key in cache_keys.items():
+            file_path, bill_id = invoices[int(custom_id)]
+            try:
+                body = batch_response_body(results_by_id.get(custom_id), batch.status)
+                invoice_data_dict, error = self._parse_response(ChatCompletion.model_validate(body), file_path)
+                if invoice_data_dict is None:
+                    raise RuntimeError(error)
+                
+                result = self._dict_to_invoice_data(invoice_data_dict, bill_id, file_path)
+                if cache_key:
+                    self.cache.set(cache_key, self._invoice_data_to_cache_dict(result))
+                results[int(custom_id)] = result
+                
+            except Exception as e:
+                logger.error(f"Batch extraction failed for {file_path}: {str(e)}")
+
+        logger.info(f"Batch {batch.id} finished with status {batch.status}: "
+                    f"{sum(1 for result in results if result)}/{len(invoices)} invoices extracted")
+        return results
+
+    def _prepare_invoice_safely(self, file_path: str, bill_id: str) -> Tuple:
+        """_prepare_invoice that logs and returns an empty result instead of raising"""
+        try:
+            return self._prepare_invoice(file_path, bill_id)
+        except Exception as e:
+            logger.error(f"Error processing invoice {file_path}: {str(e)}")
+            return None, None, None
+
+    def _prepare_invoice(self, file_path: str, bill_id: str
+                         ) -> Tuple[Optional[str], Optional[InvoiceData], Optional[ExtractedContent]]:
+        """
+        Blocking half of processing an invoice: cache lookup, then content extraction on a miss
+
+        Returns:
+            Tuple of (cache_key, cached InvoiceData, extracted content) - content is None on a
+            cache hit, an unsupported file type or an extraction failure
+        """
+        logger.info(f"Processing invoice: {file_path} for bill {bill_id}")
+        
+        extractor = self._get_content_extractor(file_path)
+        if extractor is None:
+            return None, None, None
+        
+        cache_key, cached = self._lookup_cache(file_path, bill_id)
+        if cached:
+            return cache_key, cached, None
+        
+        return cache_key, None, extractor(file_path)
+
+    async def _finish_invoice_async(self, prepared: Tuple, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+        """Network half of processing an invoice: analyze prepared content with OpenAI and cache the result"""
+        cache_key, cached, content = prepared
+        if cached or content is None:
+            return cached
+        
+        text_content, image_data = content
+        result = await self._analyze_with_openai_async(
+            text_content=text_content,
+            image_data=image_data,
+            file_path=file_path,
+            bill_id=bill_id
+        )
+        
+        if cache_key and result:
+            await asyncio.to_thread(self.cache.set, cache_key, self._invoice_data_to_cache_dict(result))
+        
+        return result
+
+    def _get_content_extractor(self, file_path: str) -> Optional[Callable[[str], Optional[ExtractedContent]]]:
+        """Pick the content extractor for a file type, or None if the type is unsupported"""
+        file_type = self._get_file_type(file_path)
+        
+        if file_type == 'pdf':
+            return self._extract_pdf_content
+        elif file_type in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
+            return self._extract_image_content
+        elif file_type in ['xlsx', 'xls']:
+            return self._extract_excel_content
+        elif file_type in ['docx', 'doc']:
+            return self._extract_word_content
+        
+        logger.warning(f"Unsupported file type: {file_type} for {file_path}")
+        return None
+
+    def _lookup_cache(self, file_path: str, bill_id: str) -> Tuple[Optional[str], Optional[InvoiceData]]:
+        """
+        Check the extraction cache for this file's content
+
+        Identical file content (e.g. the same PDF attached to several bills) is extracted only once.
+
+        Returns:
+            Tuple of (cache_key, cached InvoiceData) - key is None when caching is disabled,
+            InvoiceData is None on a miss
+        """
+        cache_key = self._cache_key(file_path) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached:
+                logger.info(f"Extraction cache hit for {file_path}")
+                return cache_key, self._dict_to_cached_invoice_data(cached, bill_id, file_path)
+        return cache_key, None
+
     def _get_file_type(self, file_path: str) -> str:
         return Path(file_path).suffix.lower().lstrip('.')
 
-    def _process_pdf(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+    def _cache_key(self, file_path: str) -> Optional[str]:
+        """Cache key from the file's content hash plus everything else that shapes the extraction request"""
         try:
-            doc = fitz.open(file_path)
-            
-            # Extract text from all pages
-            text_content = ""
-            page_images = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text_content += page.get_text()
+            return make_extraction_cache_key(
+                file_hash=hash_file(file_path),
+                model_config=self._model_config,
+                system_prompt=self._system_prompt,
+                user_prompt=self._user_prompt,
+                extraction_settings={
+                    'max_text_tokens': MAX_TEXT_TOKENS,
+                    'max_render_zoom': MAX_RENDER_ZOOM,
+                    'max_image_dimension': MAX_IMAGE_DIMENSION,
+                    'jpeg_quality': JPEG_QUALITY,
+                    'min_text_chars_for_text_only': MIN_TEXT_CHARS_FOR_TEXT_ONLY
+                }
+            )
+        except Exception as e:
+            logger.warning(f"Could not compute extraction cache key for {file_path}: {str(e)}")
+            return None
+
+    def _invoice_data_to_cache_dict(self, invoice_data: InvoiceData) -> Dict:
+        """Extracted fields only - bill, file path and timestamp belong to the request, not the content"""
+        data = asdict(invoice_data)
+        for field in ('bill_id', 'file_path', 'extracted_at'):
+            data.pop(field)
+        return data
+
+    def _dict_to_cached_invoice_data(self, cached: Dict, bill_id: str, file_path: str) -> InvoiceData:
+        """Rebuild InvoiceData from a cached extraction for the current bill and file"""
+        return InvoiceData(
+            **{**cached, 'invoice_date': self._parse_date(cached.get('invoice_date'))},
+            bill_id=bill_id,
+            extracted_at=datetime.now(),
+            file_path=file_path
+        )
+
+    def _extract_pdf_content(self, file_path: str) -> Optional[ExtractedContent]:
+        """Extract text and (for scanned pages) page images from a PDF"""
+        try:
+            # The document is closed (even on errors) before the slow OpenAI call
+            with fitz.open(file_path) as doc:
+                # Extract text page by page; only the first MAX_TEXT_TOKENS are sent to the model, so stop
+                # extracting once MAX_TEXT_CHARS are collected (most invoices resolve on the first page)
+                text_parts = []
+                text_length = 0
+                scanned_pages = []  # Pages without a text layer need OCR via vision
+                
+                for page_num in range(len(doc)):
+                    if text_length >= MAX_TEXT_CHARS:
+                        # Past the cutoff only look for scanned pages: a page without fonts has no
+                        # text layer (reads the page resources only, no text extraction)
+                        if not doc.get_page_fonts(page_num):
+                            scanned_pages.append(page_num)
+                        continue
+
+                    page_text = doc.load_page(page_num).get_text("text", flags=fitz.TEXT_DEHYPHENATE)
+                    if not page_text.strip():
+                        scanned_pages.append(page_num)
+                    text_parts.append(page_text)
+                    text_length += len(page_text)
+                
+                text_content = "".join(text_parts)
+                
+                # Digitally-native PDFs already carry their content as text - only rasterize pages without text.
+                # Mostly-scanned PDFs get every page rendered for visual analysis.
+                if len(text_content.strip()) > MIN_TEXT_CHARS_FOR_TEXT_ONLY:
+                    pages_to_render = scanned_pages
+                else:
+                    pages_to_render = range(len(doc))
                 
-                # Convert each page to image for visual analysis
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom
-                img_data = pix.tobytes("png")
-                page_images.append(img_data)
+                page_images = [self._render_page_image(doc.load_page(page_num)) for page_num in pages_to_render]
             
-            doc.close()
+            if not page_images:
+                logger.info(f"Text-rich PDF, sending text only (no page images): {file_path}")
             
-            return self._analyze_with_openai(
-                text_content=text_content,
-                image_data=page_images,
-                file_path=file_path,
-                bill_id=bill_id
-            )
+            return text_content, page_images or None
             
         except Exception as e:
             logger.error(f"Error processing PDF {file_path}: {str(e)}")
             return None
 
-    def _process_image(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+    def _render_page_image(self, page) -> bytes:
+        """Render a PDF page as JPEG, capped at MAX_IMAGE_DIMENSION on the longest side"""
+        zoom = min(MAX_RENDER_ZOOM, MAX_IMAGE_DIMENSION / max(page.rect.width, page.rect.height))
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        img_data = pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+        pix = None  # Free the raw pixmap buffer now rather than at the next GC
+        return img_data
+
+    def _extract_image_content(self, file_path: str) -> Optional[ExtractedContent]:
         try:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
+            # Encode straight from a memory map so the raw file is never copied into a bytes object
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                image_url = self._image_data_url(mm)
             
-            return self._analyze_with_openai(
-                text_content="",
-                image_data=[image_data],  # Wrap in list for consistency
-                file_path=file_path,
-                bill_id=bill_id
-            )
+            return "", [image_url]  # Wrap in list for consistency
             
         except Exception as e:
             logger.error(f"Error processing image {file_path}: {str(e)}")
             return None
 
-    def _process_excel(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+    def _extract_excel_content(self, file_path: str) -> Optional[ExtractedContent]:
         """
-        Process Excel file by converting it to PDF first, then using Vision AI
+        Extract Excel content by converting it to PDF first, so it can be analyzed with Vision AI
         This gives much better results than text extraction
         """
         try:
@@ -153,8 +567,8 @@ class InvoiceProcessor:
 
                 logger.info(f"Excel converted to PDF: {pdf_path}")
 
-                # Now process the PDF using the existing PDF processor
-                result = self._process_pdf(str(pdf_path), bill_id)
+                # Now extract the PDF using the existing PDF extractor
+                result = self._extract_pdf_content(str(pdf_path))
 
                 # Clean up temporary PDF
                 if pdf_path.exists():
@@ -173,48 +587,54 @@ class InvoiceProcessor:
 
             # Fallback to text extraction if PDF conversion fails
             try:
-                import pandas as pd
-                excel_data = pd.read_excel(file_path, sheet_name=None)
-
-                text_content = "Excel file contents:\n\n"
-                for sheet_name, df in excel_data.items():
-                    text_content += f"=== SHEET: {sheet_name} ===\n"
-                    df_limited = df.head(100)
-                    text_content += df_limited.to_csv(index=False)
-                    text_content += "\n"
-
-                return self._analyze_with_openai(
-                    text_content=text_content,
-                    image_data=None,
-                    file_path=file_path,
-                    bill_id=bill_id
-                )
+                return self._extract_excel_text(file_path), None
             except Exception as e2:
                 logger.error(f"Fallback text extraction also failed: {str(e2)}")
                 return None
 
-    def _process_word(self, file_path: str, bill_id: str) -> Optional[InvoiceData]:
+    def _extract_excel_text(self, file_path: str, max_rows: int = 100) -> str:
+        """
+        Read the first rows of every sheet as CSV text
+
+        Streams rows with openpyxl in read-only mode, so only max_rows per sheet are
+        parsed instead of loading whole sheets into DataFrames.
+        """
+        from openpyxl import load_workbook
+
+        output = io.StringIO()
+        output.write("Excel file contents:\n\n")
+        writer = csv.writer(output, lineterminator="\n")
+
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                output.write(f"=== SHEET: {ws.title} ===\n")
+                # Header row + up to max_rows data rows
+                writer.writerows(
+                    ["" if value is None else value for value in row]
+                    for row in islice(ws.iter_rows(values_only=True), max_rows + 1)
+                )
+                output.write("\n")
+        finally:
+            wb.close()
+
+        return output.getvalue()
+
+    def _extract_word_content(self, file_path: str) -> Optional[ExtractedContent]:
         try:
             from docx import Document
             
             doc = Document(file_path)
-            text_content = ""
-            
-            for paragraph in doc.paragraphs:
-                text_content += paragraph.text + "\n"
+            lines = [paragraph.text for paragraph in doc.paragraphs]
             
             # Extract tables
             for table in doc.tables:
                 for row in table.rows:
-                    row_text = " | ".join([cell.text for cell in row.cells])
-                    text_content += row_text + "\n"
+                    lines.append(" | ".join(cell.text for cell in row.cells))
             
-            return self._analyze_with_openai(
-                text_content=text_content,
-                image_data=None,
-                file_path=file_path,
-                bill_id=bill_id
-            )
+            text_content = "\n".join(lines) + "\n" if lines else ""
+            
+            return text_content, None
             
         except Exception as e:
             logger.error(f"Error processing Word document {file_path}: {str(e)}")
@@ -223,109 +643,190 @@ class InvoiceProcessor:
     def _analyze_with_openai(self, text_content: str, image_data, 
                            file_path: str, bill_id: str) -> Optional[InvoiceData]:
         try:
-            # Prepare template variables
-            template_vars = {'content_section': ''}
-            
-            # Get prompts and model config from prompt manager
-            system_prompt = get_system_prompt("invoice_extraction")
-            user_prompt = get_user_prompt("invoice_extraction", **template_vars)
-            model_config = get_model_config("invoice_extraction")
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": user_prompt}
-                    ]
-                }
-            ]
-            
-            if text_content:
-                messages[1]["content"].append({
-                    "type": "text", 
-                    "text": f"\nExtracted text content:\n{text_content[:8000]}"  # Limit text length
-                })
-            
-            if image_data:
-                # Handle both single image (bytes) and multiple images (list)
-                if isinstance(image_data, list):
-                    # Multiple page images
-                    for i, img_bytes in enumerate(image_data):
-                        base64_image = base64.b64encode(img_bytes).decode('utf-8')
-                        messages[1]["content"].append({
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}",
-                                "detail": "high"
-                            }
-                        })
-                else:
-                    # Single image (backwards compatibility)
-                    base64_image = base64.b64encode(image_data).decode('utf-8')
-                    messages[1]["content"].append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}",
-                            "detail": "high"
-                        }
-                    })
-            
-            # Build API parameters dynamically based on model requirements
-            api_params = {
-                'model': model_config['model'],
-                'messages': messages
-            }
+            api_params = self._build_api_params(text_content, image_data)
             
-            # Add token limit parameter (varies by model)
-            if 'max_completion_tokens' in model_config:
-                api_params['max_completion_tokens'] = model_config['max_completion_tokens']
-            elif 'max_tokens' in model_config:
-                api_params['max_tokens'] = model_config['max_tokens']
+            for attempt in range(MAX_PARSE_RETRIES + 1):
+                response = self._create_completion(api_params)
+                invoice_data_dict, error = self._parse_response(response, file_path)
+                if invoice_data_dict is not None:
+                    return self._dict_to_invoice_data(invoice_data_dict, bill_id, file_path)
+                if attempt < MAX_PARSE_RETRIES:
+                    logger.warning(f"Retrying {file_path} with parse error feedback ({attempt + 1}/{MAX_PARSE_RETRIES})")
+                    api_params = self._add_parse_feedback(api_params, response, error)
             
-            # Add temperature if supported
-            if 'temperature' in model_config:
-                api_params['temperature'] = model_config['temperature']
-            
-            response = self.client.chat.completions.create(**api_params)
-            
-            # Log token usage for performance monitoring
-            if hasattr(response, 'usage') and response.usage:
-                usage = response.usage
-                logger.info(f"Token usage - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}, Total: {usage.total_tokens}")
-            
-            result = response.choices[0].message.content
-            logger.debug(f"OpenAI response for {file_path}: {result}")
+            return None
             
-            # Clean the response - remove markdown code blocks if present
-            cleaned_result = result.strip()
-            if cleaned_result.startswith('```json'):
-                cleaned_result = cleaned_result[7:]  # Remove ```json
-            if cleaned_result.startswith('```'):
-                cleaned_result = cleaned_result[3:]   # Remove ```
-            if cleaned_result.endswith('```'):
-                cleaned_result = cleaned_result[:-3]  # Remove closing ```
-            cleaned_result = cleaned_result.strip()
+        except Exception as e:
+            logger.error(f"Error analyzing with OpenAI for {file_path}: {str(e)}")
+            return None
+
+    async def _analyze_with_openai_async(self, text_content: str, image_data,
+                                         file_path: str, bill_id: str) -> Optional[InvoiceData]:
+        """Async version of _analyze_with_openai"""
+        try:
+            api_params = self._build_api_params(text_content, image_data)
             
-            # Parse JSON response
-            try:
-                invoice_data_dict = json.loads(cleaned_result)
-            except json.JSONDecodeError as json_err:
-                logger.error(f"JSON parsing failed for {file_path}. Raw response: {result}")
-                logger.error(f"Cleaned response: {cleaned_result}")
-                logger.error(f"JSON error: {str(json_err)}")
-                return None
+            for attempt in range(MAX_PARSE_RETRIES + 1):
+                response = await self._create_completion_async(api_params)
+                invoice_data_dict, error = self._parse_response(response, file_path)
+                if invoice_data_dict is not None:
+                    return self._dict_to_invoice_data(invoice_data_dict, bill_id, file_path)
+                if attempt < MAX_PARSE_RETRIES:
+                    logger.warning(f"Retrying {file_path} with parse error feedback ({attempt + 1}/{MAX_PARSE_RETRIES})")
+                    api_params = self._add_parse_feedback(api_params, response, error)
             
-            # Convert to InvoiceData object
-            return self._dict_to_invoice_data(invoice_data_dict, bill_id, file_path)
+            return None
             
         except Exception as e:
             logger.error(f"Error analyzing with OpenAI for {file_path}: {str(e)}")
             return None
 
+    def _build_base_params(self, model_config: Dict) -> Dict:
+        """Build the chat completion parameters shared by every extraction call (everything but messages)"""
+        # Build API parameters dynamically based on model requirements
+        base_params = {
+            'model': model_config['model'],
+            'prompt_cache_key': 'invoice_extraction'  # Routes requests sharing the static prefix to the same cache
+        }
+
+        # Add token limit parameter (varies by model)
+        if 'max_completion_tokens' in model_config:
+            base_params['max_completion_tokens'] = model_config['max_completion_tokens']
+        elif 'max_tokens' in model_config:
+            base_params['max_tokens'] = model_config['max_tokens']
+
+        # Add temperature if supported
+        if 'temperature' in model_config:
+            base_params['temperature'] = model_config['temperature']
+
+        # Structured output from YAML (json_schema guarantees a schema-conforming JSON reply)
+        if 'response_format' in model_config:
+            base_params['response_format'] = model_config['response_format']
+
+        return base_params
+
+    def _build_api_params(self, text_content: str, image_data) -> Dict:
+        """Build chat completion parameters for an invoice extraction"""
+        # Static content first: the system prompt and instructions are byte-identical for every invoice,
+        # so OpenAI's automatic prompt caching can reuse that prefix. Per-file text and images go last.
+        messages = [
+            {
+                "role": "system",
+                "content": self._system_prompt
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": self._user_prompt}
+                ]
+            }
+        ]
+
+        if text_content:
+            messages[1]["content"].append({
+                "type": "text", 
+                "text": f"\nExtracted text content:\n{truncate_to_tokens(text_content, MAX_TEXT_TOKENS, self._model_config['model'])}"
+            })
+
+        if image_data:
+            # Handle both single image (bytes) and multiple images (list)
+            images = image_data if isinstance(image_data, list) else [image_data]
+            for image in images:
+                messages[1]["content"].append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image if isinstance(image, str) else self._image_data_url(image),
+                        "detail": "high"
+                    }
+                })
+
+        return {**self._base_params, 'messages': messages}
+
+    def _parse_response(self, response, file_path: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Parse the model's JSON reply
+
+        Returns:
+            Tuple of (invoice data dict, None) on success, or (None, error message) if the
+            reply is not a JSON object
+        """
+        # Log token usage for performance monitoring (cached = prompt prefix served from OpenAI's prompt cache)
+        if hasattr(response, 'usage') and response.usage:
+            usage = response.usage
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached_tokens = (getattr(details, 'cached_tokens', None) or 0) if details else 0
+            logger.info(f"Token usage - Input: {usage.prompt_tokens} (cached: {cached_tokens}), "
+                        f"Output: {usage.completion_tokens}, Total: {usage.total_tokens}")
+
+        result = response.choices[0].message.content
+        logger.debug(f"OpenAI response for {file_path}: {result}")
+
+        if not result:
+            refusal = getattr(response.choices[0].message, 'refusal', None)
+            logger.error(f"Empty response for {file_path} (finish reason: {response.choices[0].finish_reason}, refusal: {refusal})")
+            return None, "empty response"
+
+        # Structured output (response_format json_schema) returns bare JSON - no markdown fences to strip
+        try:
+            invoice_data_dict = orjson.loads(result)
+        except orjson.JSONDecodeError as json_err:
+            logger.error(f"JSON parsing failed for {file_path}. Raw response: {result}")
+            logger.error(f"JSON error: {str(json_err)}")
+            return None, f"invalid JSON: {str(json_err)}"
+
+        if not isinstance(invoice_data_dict, dict):
+            logger.error(f"Expected a JSON object for {file_path}, got: {result}")
+            return None, "expected a JSON object"
+
+        return invoice_data_dict, None
+
+    def _add_parse_feedback(self, api_params: Dict, response, error: str) -> Dict:
+        """Append the invalid reply and the parse error to the conversation so the retry can correct it"""
+        return {
+            **api_params,
+            'messages': api_params['messages'] + [
+                {"role": "assistant", "content": response.choices[0].message.content or ""},
+                {"role": "user", "content": f"Your output had error: {error}. Fix it and return only the JSON object."}
+            ]
+        }
+
+    def _image_data_url(self, img_bytes) -> str:
+        """
+        Build a base64 data URL, assembling bytes and decoding once to avoid extra full-size copies
+
+        Accepts any bytes-like object (bytes, mmap, memoryview).
+        """
+        prefix = f"data:{self._get_image_mime_type(img_bytes)};base64,".encode('ascii')
+        return (prefix + binascii.b2a_base64(img_bytes, newline=False)).decode('ascii')
+
+    def _get_image_mime_type(self, img_bytes: bytes) -> str:
+        """Detect the MIME type for an image data URL from its magic bytes (defaults to PNG)"""
+        if img_bytes[:3] == b'\xff\xd8\xff':
+            return 'image/jpeg'
+        if img_bytes[:6] in (b'GIF87a', b'GIF89a'):
+            return 'image/gif'
+        if img_bytes[:4] == b'RIFF' and img_bytes[8:12] == b'WEBP':
+            return 'image/webp'
+        return 'image/png'
+
+    @openai_retry
+    def _create_completion(self, api_params: Dict):
+        """Call the chat completions API, retrying transient errors with exponential backoff + jitter"""
+        # Wait for RPM/TPM capacity, then correct the limiter from the response headers
+        rate_limiter = get_rate_limiter()
+        rate_limiter.acquire(estimate_tokens(api_params))
+        raw_response = self.client.chat.completions.with_raw_response.create(**api_params)
+        rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
+
+    @openai_retry
+    async def _create_completion_async(self, api_params: Dict):
+        """Async version of _create_completion"""
+        rate_limiter = get_rate_limiter()
+        await rate_limiter.acquire_async(estimate_tokens(api_params))
+        raw_response = await self.async_client.chat.completions.with_raw_response.create(**api_params)
+        rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
 
     def _dict_to_invoice_data(self, data_dict: Dict, bill_id: str, file_path: str) -> InvoiceData:
         # Create line items summary
@@ -360,17 +861,40 @@ class InvoiceProcessor:
         if not date_str:
             return None
         try:
+            # fromisoformat is a C fast path for zero-padded YYYY-MM-DD (much cheaper than strptime);
+            # the digit check keeps ISO week dates like 2025-W01-1 off it on Python 3.11+
+            if len(date_str) == 10 and date_str[4] == date_str[7] == '-' and date_str[5:7].isdigit():
+                try:
+                    return date.fromisoformat(date_str)
+                except ValueError:
+                    pass
+            # Anything else (e.g. 2025-1-5) is parsed as before
             return datetime.strptime(date_str, '%Y-%m-%d').date()
         except (ValueError, TypeError):
             return None
 
     def process_multiple_invoices(self, invoice_files: List[str], bill_id: str) -> List[InvoiceData]:
-        results = []
-        
-        for file_path in invoice_files:
-            result = self.process_invoice(file_path, bill_id)
-            if result:
-                results.append(result)
+        """
+        Process several invoice files concurrently (each call is dominated by the OpenAI round-trip)
+
+        Files run on the processor's persistent worker pool (max_workers threads), so
+        repeated calls reuse the same threads and their warm HTTP connections.
+
+        Args:
+            invoice_files: Paths of the invoice files to process
+            bill_id: Bill the files belong to
+
+        Returns:
+            Successfully extracted InvoiceData objects, in input order
+        """
+        if not invoice_files:
+            return []
+
+        executor = self._get_executor()
+        results = [
+            result for result in executor.map(lambda file_path: self.process_invoice(file_path, bill_id), invoice_files)
+            if result
+        ]
         
         logger.info(f"Processed {len(results)} invoices successfully for bill {bill_id}")
         return results
@@ -0,0 +1,209 @@
+"""
+OpenAI Clients - Module-level singleton OpenAI clients keyed by API key
+
+Every processor instance used to build its own OpenAI client, which means a fresh
+connection pool and TLS handshakes each time. Clients are created once per API key
+here and shared, so connections are reused across processors and workers.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import orjson
+
+import httpx
+from openai import (OpenAI, AsyncOpenAI, DefaultAioHttpClient,
+                    RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+from openai.types import Batch
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception_type, before_sleep_log
+
+from config.settings import OpenAIConfig
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# SDK-internal retries are disabled - callers retry with tenacity
+_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+_LIMITS = httpx.Limits(
+    max_connections=OpenAIConfig.MAX_CONCURRENCY * 2,
+    max_keepalive_connections=OpenAIConfig.MAX_CONCURRENCY
+)
+
+# Transient OpenAI errors (rate limits, timeouts, 5xx) that are worth retrying.
+# Anything else (auth, invalid request) propagates to the caller immediately.
+RETRYABLE_OPENAI_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+_exponential_wait = wait_random_exponential(multiplier=1, max=60)
+
+
+def _wait_with_retry_after(retry_state) -> float:
+    """Exponential backoff with jitter, but never shorter than the server's Retry-After header"""
+    wait_seconds = _exponential_wait(retry_state)
+
+    response = getattr(retry_state.outcome.exception(), 'response', None)
+    if response is not None:
+        try:
+            wait_seconds = max(wait_seconds, float(response.headers.get('retry-after')))
+        except (TypeError, ValueError):
+            pass
+
+    return wait_seconds
+
+
+# Shared retry policy for sync and async OpenAI calls
+openai_retry = retry(
+    stop=stop_after_attempt(6),
+    wait=_wait_with_retry_after,
+    retry=retry_if_exception_type(RETRYABLE_OPENAI_ERRORS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+
+_sync_clients: Dict[str, OpenAI] = {}
+_async_clients: Dict[str, AsyncOpenAI] = {}
+_client_lock = threading.Lock()
+
+
+def get_sync_client(api_key: str) -> OpenAI:
+    """Get the shared OpenAI client for an API key, creating it on first use"""
+    with _client_lock:
+        client = _sync_clients.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                timeout=_TIMEOUT,
+                max_retries=0,
+                http_client=httpx.Client(limits=_LIMITS)
+            )
+            _sync_clients[api_key] = client
+            logger.info("Created shared OpenAI client")
+        return client
+
+
+def get_async_client(api_key: str) -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for an API key, creating it on first use
+
+    The underlying HTTP session is bound to the event loop it is first used on,
+    so call close_async_clients() before that loop shuts down.
+    """
+    with _client_lock:
+        client = _async_clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                timeout=_TIMEOUT,
+                max_retries=0,
+                http_client=_create_async_http_client()
+            )
+            _async_clients[api_key] = client
+            logger.info("Created shared AsyncOpenAI client")
+        return client
+
+
+def _create_async_http_client() -> httpx.AsyncClient:
+    """
+    Create the async HTTP client, preferring the aiohttp transport
+
+    httpx's own async transport degrades at high concurrency; aiohttp keeps throughput
+    up. Falls back to plain httpx if the openai[aiohttp] extra is not installed.
+
+    httpx limits do not reach the aiohttp transport, so _LIMITS only applies to the
+    fallback; with aiohttp, concurrency is bounded by the callers' worker semaphores.
+    """
+    try:
+        return DefaultAioHttpClient()
+    except RuntimeError:
+        logger.warning("aiohttp transport not available (pip install 'openai[aiohttp]'), using httpx")
+        return httpx.AsyncClient(limits=_LIMITS)
+
+
+async def close_async_clients():
+    """Close and forget all cached async clients (the next get_async_client call creates a new one)"""
+    with _client_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+
+    for client in clients:
+        await client.close()
+
+
+def close_sync_clients():
+    """Close all cached sync clients to drain their connection pools"""
+    with _client_lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug(f"Error closing OpenAI client: {str(e)}")
+
+
+atexit.register(close_sync_clients)
+
+
+def run_chat_completions_batch(client: OpenAI, input_path: Path, request_count: int,
+                               poll_interval: int = 30) -> Tuple[Batch, Dict[str, Dict]]:
+    """
+    Run a Chat Completions JSONL file through the Batch API and wait for it to finish
+
+    Args:
+        client: OpenAI client
+        input_path: JSONL file with one {"custom_id", "method", "url", "body"} request per line
+        request_count: Number of requests in the file (for progress logging)
+        poll_interval: Seconds between batch status checks
+
+    Returns:
+        Tuple of (final batch object, per-request results keyed by custom_id) - successes
+        come from the output file and failures from the error file
+    """
+    with open(input_path, 'rb') as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {request_count} requests")
+
+    while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        logger.info(f"Batch {batch.id}: {batch.status} "
+                    f"({counts.completed if counts else 0}/{counts.total if counts else request_count} done)")
+
+    results_by_id = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if line.strip():
+                result = orjson.loads(line)
+                results_by_id[result['custom_id']] = result
+
+    return batch, results_by_id
+
+
+def batch_response_body(result: Dict, batch_status: str) -> Dict:
+    """
+    Get the Chat Completions response body from one batch result line
+
+    Raises:
+        RuntimeError: If the request has no result or did not succeed
+    """
+    if result is None:
+        raise RuntimeError(f"No batch result (batch status: {batch_status})")
+
+    response = result.get('response') or {}
+    if result.get('error') or response.get('status_code') != 200:
+        raise RuntimeError(f"Batch request failed: {result.get('error') or response.get('body')}")
+
+    return response['body']
@@ -0,0 +1,181 @@
+"""
+OpenAI Rate Limiter - Proactive request/token throttling for OpenAI API calls
+
+Token-bucket throttle for both requests-per-minute (RPM) and tokens-per-minute (TPM),
+following the OpenAI cookbook parallel request processor pattern. Each call reserves
+one request and an *estimated* token count before it is sent, so batches stay under
+the plan limits instead of burning wall time on 429 retries.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings import OpenAIConfig
+from src.utils.logger import setup_logger
+from src.utils.token_counter import count_tokens
+
+logger = setup_logger(__name__)
+
+# Rough token cost of one high-detail page image (4 tiles x 170 + 85 base)
+IMAGE_TOKEN_ESTIMATE = 765
+
+# Completion tokens reserved when the request does not set max_tokens
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 1000
+
+
+class RateLimiter:
+    """Thread-safe token bucket for OpenAI RPM/TPM limits, usable from threads and asyncio"""
+
+    def __init__(self, max_requests_per_minute: float, max_tokens_per_minute: float):
+        """
+        Initialize the rate limiter
+
+        Args:
+            max_requests_per_minute: Request capacity refilled per minute
+            max_tokens_per_minute: Token capacity refilled per minute
+        """
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+
+        self.available_request_capacity = max_requests_per_minute
+        self.available_token_capacity = max_tokens_per_minute
+        self._last_update_time = time.monotonic()
+        self._lock = threading.Lock()
+
+        logger.info(f"Rate limiter initialized: {max_requests_per_minute:,.0f} RPM, {max_tokens_per_minute:,.0f} TPM")
+
+    def _refill(self):
+        """Refill both buckets for the time elapsed since the last update (caller holds the lock)"""
+        now = time.monotonic()
+        elapsed = now - self._last_update_time
+        self._last_update_time = now
+
+        self.available_request_capacity = min(
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+            self.max_requests_per_minute
+        )
+        self.available_token_capacity = min(
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+            self.max_tokens_per_minute
+        )
+
+    def _try_acquire(self, estimated_tokens: int) -> float:
+        """
+        Reserve capacity for one request if available
+
+        Returns:
+            0.0 if capacity was reserved, otherwise the number of seconds to wait before retrying
+        """
+        # A single request larger than the whole bucket would otherwise wait forever
+        estimated_tokens = min(estimated_tokens, self.max_tokens_per_minute)
+
+        with self._lock:
+            self._refill()
+
+            if self.available_request_capacity >= 1 and self.available_token_capacity >= estimated_tokens:
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= estimated_tokens
+                return 0.0
+
+            request_wait = (1 - self.available_request_capacity) * 60.0 / self.max_requests_per_minute
+            token_wait = (estimated_tokens - self.available_token_capacity) * 60.0 / self.max_tokens_per_minute
+            return max(request_wait, token_wait, 0.01)
+
+    def acquire(self, estimated_tokens: int):
+        """Block the calling thread until capacity for one request is available"""
+        while True:
+            wait_seconds = self._try_acquire(estimated_tokens)
+            if wait_seconds == 0.0:
+                return
+            time.sleep(wait_seconds)
+
+    async def acquire_async(self, estimated_tokens: int):
+        """Wait (without blocking the event loop) until capacity for one request is available"""
+        while True:
+            wait_seconds = self._try_acquire(estimated_tokens)
+            if wait_seconds == 0.0:
+                return
+            await asyncio.sleep(wait_seconds)
+
+    def update_from_headers(self, headers):
+        """
+        Correct the buckets from OpenAI x-ratelimit-remaining-* response headers
+
+        The server's view includes traffic from other processes sharing the API key,
+        so the local estimate is lowered whenever the server reports less headroom.
+
+        Args:
+            headers: HTTP response headers (mapping-like)
+        """
+        remaining_requests = _parse_header_number(headers.get('x-ratelimit-remaining-requests'))
+        remaining_tokens = _parse_header_number(headers.get('x-ratelimit-remaining-tokens'))
+
+        with self._lock:
+            if remaining_requests is not None:
+                self.available_request_capacity = min(self.available_request_capacity, remaining_requests)
+            if remaining_tokens is not None:
+                self.available_token_capacity = min(self.available_token_capacity, remaining_tokens)
+
+
+def _parse_header_number(value: Optional[str]) -> Optional[float]:
+    """Parse a numeric rate-limit header value, returning None if missing or malformed"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(api_params: Dict) -> int:
+    """
+    Estimate the token cost of a chat completion request
+
+    Text is counted with the model's tiktoken encoding; images use a fixed per-image estimate.
+
+    Args:
+        api_params: Keyword arguments for chat.completions.create; message content may be
+                    a string or a list of text/image parts
+
+    Returns:
+        Estimated prompt tokens plus the completion tokens reserved for the response
+    """
+    model = api_params.get('model', '')
+    prompt_tokens = 0
+    image_count = 0
+
+    for message in api_params.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            prompt_tokens += count_tokens(content, model)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get('type') == 'text':
+                    prompt_tokens += count_tokens(part.get('text', ''), model)
+                elif part.get('type') == 'image_url':
+                    image_count += 1
+
+    max_output_tokens = (api_params.get('max_completion_tokens') or api_params.get('max_tokens')
+                         or DEFAULT_OUTPUT_TOKEN_ESTIMATE)
+
+    return prompt_tokens + image_count * IMAGE_TOKEN_ESTIMATE + max_output_tokens
+
+
+# Global instance shared by all processors using the same API key
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the global rate limiter instance"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    max_requests_per_minute=OpenAIConfig.MAX_REQUESTS_PER_MINUTE,
+                    max_tokens_per_minute=OpenAIConfig.MAX_TOKENS_PER_MINUTE
+                )
+    return _rate_limiter
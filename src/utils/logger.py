@@ -1,41 +1,121 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
+import threading
+from datetime import date
 from pathlib import Path
+from typing import Dict
 from config.settings import LOGS_DIR, AppConfig
 
+# Handlers are shared across loggers: one console handler, and one queue handler per log file.
+# All log files are written by a single background listener thread.
+_handler_lock = threading.Lock()
+_console_handler = None
+_file_handlers: Dict[Path, logging.Handler] = {}
+_log_queue = queue.SimpleQueue()
+_queue_listener = None
+
+_formatter = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+class _FileQueueHandler(logging.handlers.QueueHandler):
+    """Queues records tagged with the log file they belong to"""
+
+    def __init__(self, log_queue, log_path: Path):
+        super().__init__(log_queue)
+        self.log_path = log_path
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)  # A copy, so other handlers don't see the tag
+        record.log_path = self.log_path
+        return record
+
+class _FileRouter(logging.Handler):
+    """Writes each queued record to its log file (runs on the listener thread)"""
+
+    def __init__(self):
+        super().__init__()
+        self.file_handlers: Dict[Path, logging.FileHandler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        handler = self.file_handlers.get(record.log_path)
+        if handler is None:
+            # delay=True: the file is only created once something is actually logged to it
+            handler = logging.FileHandler(record.log_path, encoding='utf-8', delay=True)
+            handler.setFormatter(_formatter)
+            self.file_handlers[record.log_path] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self.file_handlers.values():
+            handler.close()
+        super().close()
+
+def _get_console_handler() -> logging.Handler:
+    """Get the shared stdout handler (caller holds _handler_lock)"""
+    global _console_handler
+    if _console_handler is None:
+        _console_handler = logging.StreamHandler(sys.stdout)
+        _console_handler.setLevel(logging.INFO)
+        _console_handler.setFormatter(_formatter)
+        # Set encoding to utf-8 for Unicode support
+        if hasattr(_console_handler.stream, 'reconfigure'):
+            _console_handler.stream.reconfigure(encoding='utf-8')
+    return _console_handler
+
+def _get_file_handler(log_path: Path) -> logging.Handler:
+    """
+    Get the shared handler for a log file (caller holds _handler_lock)
+
+    Records are queued and written by one background listener thread for all log
+    files, so logging calls never block on disk I/O.
+    """
+    global _queue_listener
+    log_path = log_path.resolve()
+    handler = _file_handlers.get(log_path)
+    if handler is None:
+        if _queue_listener is None:
+            _queue_listener = logging.handlers.QueueListener(_log_queue, _FileRouter())
+            _queue_listener.start()
+
+        handler = _FileQueueHandler(_log_queue, log_path)
+        _file_handlers[log_path] = handler
+    return handler
+
+def _stop_queue_listener():
+    """Flush queued records to disk and stop the listener thread"""
+    global _queue_listener
+    with _handler_lock:
+        listener, _queue_listener = _queue_listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(_stop_queue_listener)
+
 def setup_logger(name: str, log_file: str = None, level: str = None) -> logging.Logger:
     if level is None:
         level = AppConfig.LOG_LEVEL
-    
+
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
-    
+
     if logger.handlers:
         return logger
-    
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    # Set encoding to utf-8 for Unicode support
-    if hasattr(console_handler.stream, 'reconfigure'):
-        console_handler.stream.reconfigure(encoding='utf-8')
-    logger.addHandler(console_handler)
-    
+
     if log_file is None:
-        log_file = f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    file_handler = logging.FileHandler(LOGS_DIR / log_file, encoding='utf-8')
-    file_handler.setLevel(getattr(logging, level.upper()))
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
+        log_file = f"{name}_{date.today().strftime('%Y%m%d')}.log"
+
+    with _handler_lock:
+        logger.addHandler(_get_console_handler())
+        logger.addHandler(_get_file_handler(LOGS_DIR / log_file))
+
     return logger
 
 def get_logger(name: str) -> logging.Logger:
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
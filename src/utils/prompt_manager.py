@@ -1,34 +1,98 @@
 import yaml
 import json
+import functools
+import os
+import pickle
+import string
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 from datetime import datetime
 
+from config.settings import CACHE_DIR
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# libyaml's C loader is a drop-in for SafeLoader and several times faster; fall back if PyYAML lacks it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+_FORMATTER = string.Formatter()
+
+# (literal_text, field_name, format_spec, conversion) tuples from string.Formatter.parse
+CompiledTemplate = Tuple[Tuple[str, Optional[str], Optional[str], Optional[str]], ...]
+
+
+@functools.lru_cache(maxsize=32)
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    Pre-parse a str.format template once so filling it does not re-parse the string
+
+    Escaped braces ({{ }}) are resolved here, so rendering is a plain join.
+    Field names must be plain keys (no attribute or index lookups).
+    """
+    return tuple(_FORMATTER.parse(template))
+
+
+def render_template(compiled: CompiledTemplate, **values) -> str:
+    """Fill a template compiled by compile_template (equivalent to template.format(**values))"""
+    parts = []
+    for literal, field, format_spec, conversion in compiled:
+        parts.append(literal)
+        if field is not None:
+            value = values[field]
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            parts.append(format(value, format_spec) if format_spec else str(value))
+    return "".join(parts)
+
 class PromptManager:
     """Manages AI prompts loaded from external YAML files"""
     
-    def __init__(self, prompts_dir: Optional[Path] = None):
+    def __init__(self, prompts_dir: Optional[Path] = None, use_cache: bool = True):
+        """
+        Initialize the prompt manager
+
+        Args:
+            prompts_dir: Directory with the prompt YAML files (defaults to the repo's prompts/)
+            use_cache: Reuse parsed prompts from CACHE_DIR/prompts while the YAML file is unchanged
+        """
+        self.use_cache = use_cache
+        self.parse_cache_dir = CACHE_DIR / "prompts"
         if prompts_dir is None:
             self.prompts_dir = Path(__file__).parent.parent.parent / "prompts"
         else:
             self.prompts_dir = Path(prompts_dir)
         
         self._prompts_cache = {}
-        self._load_all_prompts()
+        self._prompt_files: Dict[str, Path] = {}
+        self._info_cache: Dict[str, Mapping[str, Any]] = {}
+        self._load_lock = threading.Lock()
+        self._index_prompts()
         
-        logger.info(f"Prompt manager initialized with {len(self._prompts_cache)} prompts from {self.prompts_dir}")
+        logger.info(f"Prompt manager initialized with {len(self._prompt_files)} prompt files from {self.prompts_dir}")
 
-    def _load_all_prompts(self):
-        """Load all prompt files from the prompts directory"""
+    def _index_prompts(self):
+        """Index prompt files by name (file stem) - files are only parsed on first use"""
         if not self.prompts_dir.exists():
             logger.warning(f"Prompts directory does not exist: {self.prompts_dir}")
             return
         
-        for prompt_file in self.prompts_dir.glob("*.yaml"):
+        self._prompt_files = {
+            prompt_file.stem: prompt_file
+            for prompt_file in self.prompts_dir.iterdir()
+            if prompt_file.suffix == '.yaml' and prompt_file.is_file()
+        }
+
+    def _load_all_prompts(self):
+        """Load every indexed prompt file that is not loaded yet"""
+        for prompt_name, prompt_file in self._prompt_files.items():
+            if prompt_name in self._prompts_cache:
+                continue
             try:
                 self._load_prompt_file(prompt_file)
             except Exception as e:
@@ -37,8 +101,7 @@ class PromptManager:
     def _load_prompt_file(self, file_path: Path):
         """Load a single prompt file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                prompt_config = yaml.safe_load(f)
+            prompt_config = self._parse_prompt_file(file_path)
             
             # Validate required fields
             required_fields = ['name', 'system_prompt', 'user_prompt_template']
@@ -46,8 +109,21 @@ class PromptManager:
                 if field not in prompt_config:
                     raise ValueError(f"Missing required field: {field}")
             
+            # Parse the user template once here instead of on every get_user_prompt call
+            prompt_config['_parsed_template'] = compile_template(prompt_config['user_prompt_template'])
+            prompt_config['_required_vars'] = frozenset(self._extract_template_vars(prompt_config['user_prompt_template']))
+            prompt_config['_model_config'] = MappingProxyType(self._build_model_config(prompt_config))
+            
             prompt_name = prompt_config['name']
-            self._prompts_cache[prompt_name] = prompt_config
+            # Read-only view: callers share the cached config instead of getting a copy per call
+            self._prompts_cache[prompt_name] = MappingProxyType(prompt_config)
+            self._info_cache[prompt_name] = MappingProxyType({
+                'name': prompt_name,
+                'version': prompt_config.get('version', 'unknown'),
+                'description': prompt_config.get('description', 'No description'),
+                'model': prompt_config.get('model', 'gpt-4'),
+                'template_vars': list(prompt_config['_required_vars'])
+            })
             
             logger.debug(f"Loaded prompt: {prompt_name} from {file_path.name}")
             
@@ -55,12 +131,71 @@ class PromptManager:
             logger.error(f"Error loading prompt file {file_path}: {str(e)}")
             raise
 
-    def get_prompt_config(self, prompt_name: str) -> Dict[str, Any]:
-        """Get the full prompt configuration"""
-        if prompt_name not in self._prompts_cache:
-            raise ValueError(f"Prompt '{prompt_name}' not found. Available prompts: {list(self._prompts_cache.keys())}")
+    def _parse_prompt_file(self, file_path: Path) -> Dict[str, Any]:
+        """
+        Parse a prompt YAML file, reusing the pickled parse from an earlier run while the file is unchanged
+
+        The parse cache is keyed by the file's mtime and size; stale entries for the
+        same file are removed when a new one is written.
+        """
+        if not self.use_cache:
+            return self._parse_yaml(file_path)
+        
+        st = file_path.stat()
+        cache_path = self.parse_cache_dir / f"{file_path.stem}.{st.st_mtime_ns}.{st.st_size}.pkl"
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable prompt parse cache {cache_path.name}: {str(e)}")
         
-        return self._prompts_cache[prompt_name].copy()
+        prompt_config = self._parse_yaml(file_path)
+        
+        try:
+            self.parse_cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale_path in self.parse_cache_dir.glob(f"{file_path.stem}.*.pkl"):
+                stale_path.unlink(missing_ok=True)
+            # Write then rename so a concurrent process never reads a half-written file
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(prompt_config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write prompt parse cache for {file_path.name}: {str(e)}")
+        
+        return prompt_config
+
+    def _parse_yaml(self, file_path: Path) -> Dict[str, Any]:
+        """Parse a prompt YAML file"""
+        with open(file_path, 'rb') as f:
+            return yaml.load(f, Loader=_YamlLoader)
+
+    def get_prompt_config(self, prompt_name: str) -> Mapping[str, Any]:
+        """Get the full prompt configuration (read-only - use get_prompt_config_copy to modify it)"""
+        config = self._prompts_cache.get(prompt_name)
+        if config is None:
+            # Serialize first-use loads so concurrent callers don't parse the same file twice
+            with self._load_lock:
+                config = self._prompts_cache.get(prompt_name) or self._load_indexed_prompt(prompt_name)
+        if config is None:
+            raise ValueError(f"Prompt '{prompt_name}' not found. Available prompts: {self.list_available_prompts()}")
+        
+        return config
+
+    def get_prompt_config_copy(self, prompt_name: str) -> Dict[str, Any]:
+        """Get a mutable (shallow) copy of the prompt configuration"""
+        return dict(self.get_prompt_config(prompt_name))
+
+    def _load_indexed_prompt(self, prompt_name: str) -> Optional[Mapping[str, Any]]:
+        """Parse a prompt's file on first use, scanning the other files if its name differs from the file stem"""
+        prompt_file = self._prompt_files.get(prompt_name)
+        if prompt_file is not None:
+            self._load_prompt_file(prompt_file)
+        if prompt_name not in self._prompts_cache:
+            self._load_all_prompts()
+        return self._prompts_cache.get(prompt_name)
 
     def get_system_prompt(self, prompt_name: str) -> str:
         """Get the system prompt for a given prompt name"""
@@ -70,11 +205,10 @@ class PromptManager:
     def get_user_prompt(self, prompt_name: str, **template_vars) -> str:
         """Get the user prompt with template variables filled in"""
         config = self.get_prompt_config(prompt_name)
-        template = config['user_prompt_template']
         
         try:
             # Fill in template variables
-            filled_prompt = template.format(**template_vars)
+            filled_prompt = render_template(config['_parsed_template'], **template_vars)
             return filled_prompt.strip()
             
         except KeyError as e:
@@ -85,10 +219,12 @@ class PromptManager:
             logger.error(f"Error formatting prompt template for '{prompt_name}': {str(e)}")
             raise
 
-    def get_model_config(self, prompt_name: str) -> Dict[str, Any]:
-        """Get the model configuration (model, temperature, max_tokens, etc.)"""
-        config = self.get_prompt_config(prompt_name)
-        
+    def get_model_config(self, prompt_name: str) -> Mapping[str, Any]:
+        """Get the model configuration (model, temperature, max_tokens, etc.) - precomputed, read-only"""
+        return self.get_prompt_config(prompt_name)['_model_config']
+
+    def _build_model_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the model configuration for a prompt (runs once per prompt load)"""
         model_config = {
             'model': config.get('model', 'gpt-4')
         }
@@ -103,13 +239,19 @@ class PromptManager:
         if 'temperature' in config and config.get('model', '').lower() != 'gpt-5':
             model_config['temperature'] = config.get('temperature', 0.1)
         
+        # Structured output (json_object / json_schema) if configured
+        if 'response_format' in config:
+            model_config['response_format'] = config['response_format']
+        
         return model_config
 
     def reload_prompts(self):
         """Reload all prompts from disk"""
         logger.info("Reloading all prompts from disk")
         self._prompts_cache.clear()
-        self._load_all_prompts()
+        self._info_cache.clear()
+        self._prompt_files.clear()
+        self._index_prompts()
 
     def reload_prompt(self, prompt_name: str):
         """Reload a specific prompt from disk"""
@@ -118,58 +260,54 @@ class PromptManager:
             raise FileNotFoundError(f"Prompt file not found: {prompt_file}")
         
         logger.info(f"Reloading prompt: {prompt_name}")
+        self._prompt_files[prompt_name] = prompt_file
         self._load_prompt_file(prompt_file)
 
     def list_available_prompts(self) -> list[str]:
-        """Get list of available prompt names"""
-        return list(self._prompts_cache.keys())
+        """Get list of available prompt names (indexed files plus any already loaded)"""
+        return list(self._prompt_files.keys() | self._prompts_cache.keys())
 
-    def get_prompt_info(self, prompt_name: str) -> Dict[str, Any]:
-        """Get metadata about a prompt"""
-        config = self.get_prompt_config(prompt_name)
-        
-        return {
-            'name': config['name'],
-            'version': config.get('version', 'unknown'),
-            'description': config.get('description', 'No description'),
-            'model': config.get('model', 'gpt-4'),
-            'template_vars': self._extract_template_vars(config['user_prompt_template'])
-        }
+    def get_prompt_info(self, prompt_name: str) -> Mapping[str, Any]:
+        """Get metadata about a prompt (built once at load time, read-only)"""
+        info = self._info_cache.get(prompt_name)
+        if info is None:
+            self.get_prompt_config(prompt_name)  # loads the prompt or raises ValueError
+            info = self._info_cache[prompt_name]
+        return info
 
     def _extract_template_vars(self, template: str) -> list[str]:
-        """Extract template variable names from a template string"""
-        import re
-        # Find all {variable_name} patterns
-        matches = re.findall(r'\{([^}]+)\}', template)
-        return list(set(matches))
+        """Extract template variable names from a template string (escaped {{ }} braces are literal text)"""
+        return list({field for _, field, _, _ in compile_template(template) if field is not None})
 
     def validate_template_vars(self, prompt_name: str, **template_vars) -> Dict[str, Any]:
         """Validate that all required template variables are provided"""
         config = self.get_prompt_config(prompt_name)
-        template = config['user_prompt_template']
-        required_vars = self._extract_template_vars(template)
+        required_vars = config['_required_vars']
         
-        provided_vars = set(template_vars.keys())
-        required_vars_set = set(required_vars)
+        # dict_keys is already set-like, no need to build a set from it
+        provided_vars = template_vars.keys()
         
-        missing_vars = required_vars_set - provided_vars
-        extra_vars = provided_vars - required_vars_set
+        missing_vars = required_vars - provided_vars
+        extra_vars = provided_vars - required_vars
         
         return {
-            'valid': len(missing_vars) == 0,
+            'valid': not missing_vars,
             'missing_vars': list(missing_vars),
             'extra_vars': list(extra_vars),
-            'required_vars': required_vars
+            'required_vars': list(required_vars)
         }
 
 # Global instance
 _prompt_manager = None
+_prompt_manager_lock = threading.Lock()
 
 def get_prompt_manager() -> PromptManager:
     """Get the global prompt manager instance"""
     global _prompt_manager
     if _prompt_manager is None:
-        _prompt_manager = PromptManager()
+        with _prompt_manager_lock:
+            if _prompt_manager is None:
+                _prompt_manager = PromptManager()
     return _prompt_manager
 
 # Convenience functions for common operations
@@ -181,6 +319,6 @@ def get_user_prompt(prompt_name: str, **template_vars) -> str:
     """Convenience function to get user prompt with variables"""
     return get_prompt_manager().get_user_prompt(prompt_name, **template_vars)
 
-def get_model_config(prompt_name: str) -> Dict[str, Any]:
+def get_model_config(prompt_name: str) -> Mapping[str, Any]:
     """Convenience function to get model configuration"""
     return get_prompt_manager().get_model_config(prompt_name)
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Token Counter - tiktoken-based token counting and truncation for OpenAI prompts
+"""
+
+import functools
+
+import tiktoken
+
+# Encoding used by the GPT-4o / GPT-4.1 / o-series model families
+DEFAULT_ENCODING = "o200k_base"
+
+
+@functools.lru_cache(maxsize=8)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Get the tokenizer for a model, falling back to o200k_base for models tiktoken does not know"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Number of tokens text encodes to for the given model"""
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """
+    Truncate text to at most max_tokens tokens for the given model
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        The original text if it fits, otherwise its first max_tokens tokens decoded back to text
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
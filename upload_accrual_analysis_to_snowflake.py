@@ -6,26 +6,33 @@ Reads accrual_analysis_results.csv and uploads to Snowflake table
 ACCRUALS_AUTOMATION_ANALYSIS_RESULTS
 
 Usage:
-    python upload_accrual_analysis_to_snowflake.py
+    python upload_accrual_analysis_to_snowflake.py          # Asks for confirmation
+    python upload_accrual_analysis_to_snowflake.py --yes    # No prompt (for chaining after run_accrual_analysis.py)
 """
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from config.settings import CSV_RESULTS_DIR
-from src.clients.snowflake_data_client import SnowflakeDataClient
+from src.clients.snowflake_data_client import get_snowflake_client
 from src.utils.logger import setup_logger
+from src.utils.csv_utils import count_csv_rows
 
 logger = setup_logger(__name__)
 
 
-def main():
-    """Upload accrual analysis results CSV to Snowflake"""
+def main(assume_yes=False):
+    """
+    Upload accrual analysis results CSV to Snowflake
+
+    Args:
+        assume_yes: Skip the confirmation prompt
+    """
     try:
         print("=" * 80)
         print("📤 Snowflake Upload Tool - Accrual Analysis Results")
@@ -41,12 +48,8 @@ def main():
 
         print(f"\n📄 CSV file: {csv_path}")
 
-        # Count rows in CSV (excluding header and empty lines)
-        import csv
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            rows = [row for row in reader if any(row.values())]  # Filter out empty rows
-            row_count = len(rows)
+        # Count rows in CSV (excluding header) - streamed, nothing kept in memory
+        row_count = count_csv_rows(csv_path)
 
         if row_count == 0:
             print(f"\n⚠️  CSV file is empty (no data rows)")
@@ -59,7 +62,11 @@ def main():
         print(f"\n🔍 Target Snowflake table:")
         print(f"   PSEDM_FINANCE_PROD.EDM_GTM_FPA.ACCRUALS_AUTOMATION_ANALYSIS_RESULTS")
 
-        response = input(f"\n📤 Upload {row_count} rows to Snowflake? (yes/no): ").strip().lower()
+        if assume_yes:
+            print(f"\n📤 Uploading {row_count} rows to Snowflake (--yes)")
+            response = 'yes'
+        else:
+            response = input(f"\n📤 Upload {row_count} rows to Snowflake? (yes/no): ").strip().lower()
 
         if response not in ['yes', 'y']:
             print("\n❌ Upload cancelled")
@@ -67,7 +74,7 @@ def main():
 
         # Initialize Snowflake client
         print("\n🔄 Connecting to Snowflake...")
-        snowflake_client = SnowflakeDataClient()
+        snowflake_client = get_snowflake_client()
 
         # Upload to Snowflake
         print(f"📤 Uploading {csv_path.name}...")
@@ -96,4 +103,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Upload accrual analysis results to Snowflake")
+    parser.add_argument("--yes", "-y", action="store_true", help="Upload without asking for confirmation")
+    args = parser.parse_args()
+
+    main(assume_yes=args.yes)
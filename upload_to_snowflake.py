@@ -6,25 +6,32 @@ This script uploads the CSV file with invoice extraction results to Snowflake.
 Run this AFTER reviewing the CSV file to ensure all extractions are correct.
 
 Usage:
-    python upload_to_snowflake.py
+    python upload_to_snowflake.py          # Asks for confirmation
+    python upload_to_snowflake.py --yes    # No prompt (for chaining after run_invoice_extraction.py)
 """
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
-# Add src to Python path
+# Make the project root importable (imports are package-qualified: src.*, config.*)
 sys.path.append(os.path.join(os.path.dirname(__file__)))
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.utils.logger import setup_logger
+from src.utils.csv_utils import count_csv_rows
 from config.settings import CSV_RESULTS_DIR
 
 logger = setup_logger(__name__)
 
 
-def upload_csv_to_snowflake():
-    """Upload invoice extraction results CSV to Snowflake"""
+def upload_csv_to_snowflake(assume_yes=False):
+    """
+    Upload invoice extraction results CSV to Snowflake
+
+    Args:
+        assume_yes: Skip the confirmation prompt
+    """
 
     csv_path = CSV_RESULTS_DIR / "invoice_extraction_results.csv"
 
@@ -43,16 +50,27 @@ def upload_csv_to_snowflake():
 
     # Count rows in CSV
     try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            row_count = sum(1 for line in f) - 1  # Subtract header
-        print(f"   Rows to upload: {row_count}")
+        row_count = count_csv_rows(csv_path)
     except Exception as e:
         print(f"❌ Error reading CSV: {str(e)}")
         return
 
+    # Nothing to upload - don't open a Snowflake connection just to load an empty file
+    if row_count == 0:
+        print(f"\n⚠️  CSV file is empty (no data rows)")
+        print(f"   Nothing to upload")
+        logger.info("CSV has no data rows - skipping upload")
+        return
+
+    print(f"   Rows to upload: {row_count}")
+
     # Confirm upload
     print("\n" + "=" * 60)
-    response = input(f"📋 Upload {row_count} rows to Snowflake? (yes/no): ").strip().lower()
+    if assume_yes:
+        print(f"📋 Uploading {row_count} rows to Snowflake (--yes)")
+        response = 'yes'
+    else:
+        response = input(f"📋 Upload {row_count} rows to Snowflake? (yes/no): ").strip().lower()
 
     if response not in ['yes', 'y']:
         print("\n❌ Upload cancelled")
@@ -64,9 +82,9 @@ def upload_csv_to_snowflake():
     logger.info("Uploading CSV to Snowflake")
 
     try:
-        from src.clients.snowflake_data_client import SnowflakeDataClient
+        from src.clients.snowflake_data_client import get_snowflake_client
 
-        snowflake_client = SnowflakeDataClient()
+        snowflake_client = get_snowflake_client()
         print("✅ Connected to Snowflake")
 
         print(f"\n📤 Uploading {csv_path.name}...")
@@ -95,4 +113,8 @@ def upload_csv_to_snowflake():
 
 
 if __name__ == "__main__":
-    upload_csv_to_snowflake()
+    parser = argparse.ArgumentParser(description="Upload invoice extraction results to Snowflake")
+    parser.add_argument("--yes", "-y", action="store_true", help="Upload without asking for confirmation")
+    args = parser.parse_args()
+
+    upload_csv_to_snowflake(assume_yes=args.yes)